@@ -1,14 +1,30 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
+from utils.concurrency import ContextThreadPoolExecutor
 from utils.io_utils import save_json, save_text
 from utils.llm import LocalLLM
 
 
-def _build_blog_prompt(topic: str, keywords: List[str], competitors: List[Dict[str, str]]) -> str:
+BLOG_MODES = ("single", "sectional")
+SECTIONS = ["Intro", "Benefits", "How-To", "Comparison", "FAQs", "Conclusion"]
+
+
+def get_blog_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or os.getenv("BLOG_MODE", "single")).strip().lower()
+    return mode if mode in BLOG_MODES else "single"
+
+
+def _context_lines(keywords: List[str], competitors: List[Dict[str, str]]) -> Tuple[str, str]:
     comp_lines = "\n".join(f"- {c.get('title','')} ({c.get('url','')})" for c in competitors[:5])
     kw_line = ", ".join(keywords[:12])
+    return kw_line, comp_lines
+
+
+def _build_blog_prompt(topic: str, keywords: List[str], competitors: List[Dict[str, str]]) -> str:
+    kw_line, comp_lines = _context_lines(keywords, competitors)
     return (
         "SYSTEM: You are an expert marketing writer.\n"  # guidance
         "TASK: Write a comprehensive blog post in Markdown. Include headings, bullet points, and a clear CTA.\n"
@@ -23,17 +39,66 @@ def _build_blog_prompt(topic: str, keywords: List[str], competitors: List[Dict[s
     )
 
 
-def generate_blog(topic: str, research: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
-    llm = LocalLLM()
-    keywords = research.get("trending_keywords", [])
-    competitors = research.get("competitors", [])
-    prompt = _build_blog_prompt(topic, keywords, competitors)
-    blog_md = llm.generate(prompt, max_tokens=min(600, llm.max_tokens_default))
+def _build_outline_prompt(topic: str, keywords: List[str], competitors: List[Dict[str, str]]) -> str:
+    kw_line, comp_lines = _context_lines(keywords, competitors)
+    return (
+        "SYSTEM: You are an expert marketing writer.\n"
+        "TASK: Plan a blog post. Give a strong H1 title and one line describing what each section covers.\n\n"
+        f"TOPIC: {topic}\n"
+        f"KEYWORDS: {kw_line}\n"
+        f"COMPETITORS:\n{comp_lines}\n\n"
+        "OUTPUT_FORMAT: First line 'TITLE: ...', then one line per section as 'Section: summary' for "
+        f"{', '.join(SECTIONS)}.\n\n"
+        "BLOG_OUTLINE:"
+    )
+
+
+def _build_section_prompt(topic: str, title: str, section: str, brief: str, keywords: List[str]) -> str:
+    cta = ", and end with a clear CTA" if section == SECTIONS[-1] else ""
+    return (
+        "SYSTEM: You are an expert marketing writer.\n"
+        f"TASK: Write only the '{section}' section of the blog post '{title}' in Markdown, without the heading.\n"
+        f"STYLE: Helpful, concise, SEO-friendly. Use bullet points where useful{cta}.\n\n"
+        f"TOPIC: {topic}\n"
+        f"KEYWORDS: {', '.join(keywords[:12])}\n"
+        f"SECTION_FOCUS: {brief or section}\n\n"
+        "BLOG_SECTION:"
+    )
+
 
+def _build_seo_prompt(topic: str, keywords: List[str]) -> str:
+    return (
+        "SYSTEM: You are an SEO specialist.\n"
+        "TASK: Write a meta title (under 60 characters) and a meta description (under 155 characters).\n\n"
+        f"TOPIC: {topic}\n"
+        f"KEYWORDS: {', '.join(keywords[:12])}\n\n"
+        "OUTPUT_FORMAT: 'SEO TITLE: ...' and 'SEO DESCRIPTION: ...' on separate lines.\n\n"
+        "SEO_TAGS:"
+    )
+
+
+def _parse_outline(topic: str, raw: str) -> Tuple[str, Dict[str, str]]:
+    title = ""
+    briefs: Dict[str, str] = {}
+    for line in raw.splitlines():
+        l = line.strip().lstrip("-*#0123456789. ").strip()
+        if not l or ":" not in l:
+            continue
+        head, body = (p.strip() for p in l.split(":", 1))
+        if head.lower() == "title":
+            title = body.strip("*# ")
+            continue
+        for section in SECTIONS:
+            if head.lower().strip("* ") == section.lower():
+                briefs[section] = body
+    return title or f"{topic} — A Practical Guide", briefs
+
+
+def _extract_seo(text: str, topic: str, keywords: List[str]) -> Dict[str, Any]:
     # Extract SEO tags if present in output
     seo_title = None
     seo_description = None
-    for line in blog_md.splitlines()[-10:]:
+    for line in text.splitlines()[-10:]:
         line_low = line.strip().lower()
         if line_low.startswith("seo title:"):
             seo_title = line.split(":", 1)[1].strip()
@@ -47,14 +112,77 @@ def generate_blog(topic: str, research: Dict[str, Any], output_dir: str) -> Dict
             f"Explore {topic}: key benefits, how to choose, and answers to common questions."
         )
 
-    seo = {
+    return {
         "title": seo_title,
         "meta_description": seo_description,
         "keywords": keywords[:15],
     }
 
+
+def _generate_sectional(
+    llm: LocalLLM,
+    topic: str,
+    keywords: List[str],
+    competitors: List[Dict[str, str]],
+    deadline: Optional[float] = None,
+    temperature: Optional[float] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    # Short outline first, then every section plus the SEO call in parallel
+    outline = llm.generate(
+        _build_outline_prompt(topic, keywords, competitors),
+        max_tokens=160,
+        temperature=temperature,
+        deadline=deadline,
+    )
+    title, briefs = _parse_outline(topic, outline)
+    section_tokens = int(os.getenv("BLOG_SECTION_MAX_TOKENS", str(min(300, llm.max_tokens_default))))
+    workers = max(1, int(os.getenv("BLOG_SECTION_WORKERS", str(len(SECTIONS) + 1))))
+    with ContextThreadPoolExecutor(max_workers=workers) as ex:
+        seo_future = ex.submit(
+            llm.generate, _build_seo_prompt(topic, keywords), max_tokens=96, temperature=temperature, deadline=deadline
+        )
+        futures = [
+            ex.submit(
+                llm.generate,
+                _build_section_prompt(topic, title, section, briefs.get(section, ""), keywords),
+                max_tokens=section_tokens,
+                temperature=temperature,
+                deadline=deadline,
+            )
+            for section in SECTIONS
+        ]
+        bodies = [f.result() for f in futures]
+        seo_raw = seo_future.result()
+
+    parts = [f"# {title}"]
+    for section, body in zip(SECTIONS, bodies):
+        parts.append(f"## {section}\n\n{body.strip()}")
+    return "\n\n".join(parts) + "\n", _extract_seo(seo_raw, topic, keywords)
+
+
+def generate_blog(
+    topic: str,
+    research: Dict[str, Any],
+    output_dir: str,
+    deadline: Optional[float] = None,
+    mode: Optional[str] = None,
+    temperature: Optional[float] = None,
+) -> Dict[str, Any]:
+    llm = LocalLLM()
+    keywords = research.get("trending_keywords", [])
+    competitors = research.get("competitors", [])
+    # Sectional mode only pays off with a real model; templates come from the single-call path
+    if get_blog_mode(mode) == "sectional" and llm.is_available():
+        blog_md, seo = _generate_sectional(
+            llm, topic, keywords, competitors, deadline=deadline, temperature=temperature
+        )
+    else:
+        prompt = _build_blog_prompt(topic, keywords, competitors)
+        blog_md = llm.generate(
+            prompt, max_tokens=min(600, llm.max_tokens_default), temperature=temperature, deadline=deadline
+        )
+        seo = _extract_seo(blog_md, topic, keywords)
+
     save_text(f"{output_dir}/blog.md", blog_md)
     save_json(f"{output_dir}/seo.json", seo)
     return {"blog_md": blog_md, "seo": seo}
-
-
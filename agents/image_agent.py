@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import requests
 
+from utils.deadline import expired, remaining
 from utils.io_utils import save_base64_image
 
 
+SD_TIMEOUT_SECONDS = 60.0
+
+
 def _summarize_for_prompt(blog_md: str) -> str:
     # Heuristic summary for image prompt
     lines = [l.strip() for l in blog_md.splitlines() if l.strip()]
@@ -22,7 +26,9 @@ def _summarize_for_prompt(blog_md: str) -> str:
     return f"{title}, {primary}, clean composition, modern, high contrast, photorealistic, 35mm, 4k"
 
 
-def generate_image(blog_md: str, output_dir: str) -> Dict[str, Any]:
+def generate_image(blog_md: str, output_dir: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+    if expired(deadline):
+        return {"status": "skipped"}
     sd_url = os.getenv("SD_WEBUI_URL", "http://127.0.0.1:7860").rstrip("/")
     endpoint = f"{sd_url}/sdapi/v1/txt2img"
 
@@ -37,7 +43,7 @@ def generate_image(blog_md: str, output_dir: str) -> Dict[str, Any]:
     }
 
     try:
-        resp = requests.post(endpoint, json=payload, timeout=60)
+        resp = requests.post(endpoint, json=payload, timeout=remaining(deadline, SD_TIMEOUT_SECONDS))
         resp.raise_for_status()
         data = resp.json()
         images = data.get("images", [])
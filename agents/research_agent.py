@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 import time
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
 from bs4 import BeautifulSoup  # type: ignore
 
 try:
@@ -14,23 +15,86 @@ try:
 except Exception:  # pragma: no cover
     TrendReq = None  # type: ignore
 
+from utils.concurrency import ContextThreadPoolExecutor
+from utils.deadline import expired, remaining
 from utils.io_utils import save_json
+from utils.keywords import rank_keywords, title_phrases
+from utils.rate_limit import count, limiter_for
 
 
-def _fetch_trending_keywords(topic: str) -> List[str]:
-    if TrendReq is None:
-        # Fallback: fabricate keyword variants
-        base = re.sub(r"[^a-zA-Z0-9 ]", "", topic).lower()
-        uniq = list(dict.fromkeys([
-            base,
-            f"best {base}",
-            f"{base} reviews",
-            f"{base} benefits",
-            f"buy {base}",
-        ]))
-        return uniq
-    try:
-        pytrends = TrendReq(hl='en-US', tz=360)
+# Matches pytrends' own default (2s connect, 5s read)
+TRENDS_TIMEOUT_SECONDS = 5.0
+SCRAPE_TIMEOUT_SECONDS = 8.0
+
+TRENDS_HOST = "trends.google.com"
+DUCKDUCKGO_HOST = "duckduckgo.com"
+THROTTLE_STATUSES = (202, 403, 429)
+KEYWORD_LIMIT = 20
+
+
+def _fallback_keywords(topic: str) -> List[str]:
+    # Fabricate keyword variants when trends are unavailable
+    base = re.sub(r"[^a-zA-Z0-9 ]", "", topic).lower()
+    return list(dict.fromkeys([
+        base,
+        f"best {base}",
+        f"{base} reviews",
+        f"{base} benefits",
+        f"buy {base}",
+    ]))
+
+
+def _fallback_competitors(topic: str) -> List[Dict[str, Any]]:
+    return [
+        {"title": f"Top {topic} alternatives", "url": "https://example.com/alt"},
+        {"title": f"Best {topic} in 2025", "url": "https://example.com/best"},
+    ]
+
+
+class _Throttled(Exception):
+    pass
+
+
+def _is_throttle(err: Exception) -> bool:
+    if isinstance(err, _Throttled) or type(err).__name__ == "TooManyRequestsError":
+        return True
+    status = getattr(getattr(err, "response", None), "status_code", None)
+    return status in THROTTLE_STATUSES
+
+
+def _call_host(host: str, attempt: Callable[[], Any], deadline: Optional[float] = None) -> Optional[Any]:
+    # Queue on the shared per-host limiter and retry throttled attempts. Other errors (offline, DNS,
+    # bad markup) return None right away so the caller falls back. None also once budget or attempts run out
+    limiter = limiter_for(host)
+    for _ in range(max(1, int(os.getenv("RESEARCH_MAX_ATTEMPTS", "2")))):
+        wait = None if deadline is None else remaining(deadline, float("inf"))
+        if expired(deadline) or not limiter.acquire(timeout=wait):
+            count(f"{host}.budget_exhausted")
+            return None
+        count(f"{host}.requests")
+        try:
+            result = attempt()
+        except Exception as e:
+            if not _is_throttle(e):
+                count(f"{host}.errors")
+                limiter.on_error()
+                return None
+            count(f"{host}.throttled")
+            limiter.on_throttle()
+            continue
+        limiter.on_success()
+        return result
+    return None
+
+
+def _fetch_trending_keywords(topic: str, deadline: Optional[float] = None) -> Tuple[List[str], bool]:
+    if TrendReq is None or expired(deadline):
+        count(f"{TRENDS_HOST}.fallbacks")
+        return _fallback_keywords(topic), False
+
+    def attempt() -> List[str]:
+        timeout = remaining(deadline, TRENDS_TIMEOUT_SECONDS)
+        pytrends = TrendReq(hl='en-US', tz=360, timeout=(min(timeout, 2.0), timeout))
         kw_list = [topic]
         pytrends.build_payload(kw_list, cat=0, timeframe='today 3-m', geo='', gprop='')
         related = pytrends.related_queries()
@@ -40,27 +104,30 @@ def _fetch_trending_keywords(topic: str) -> List[str]:
                 continue
             top_df = data.get("top")
             if top_df is not None:
-                out.extend(top_df["query"].head(10).tolist())
-        # Deduplicate and keep up to 20
-        cleaned = []
-        seen = set()
-        for k in out:
-            k2 = k.strip().lower()
-            if k2 and k2 not in seen:
-                seen.add(k2)
-                cleaned.append(k)
-        return cleaned[:20] or [topic]
-    except Exception:
-        return [topic, f"{topic} review", f"best {topic}", f"{topic} price", f"{topic} vs alternatives"]
-
-
-def _scrape_competitors(topic: str, limit: int = 5) -> List[Dict[str, Any]]:
+                # Raw values only; normalization and dedup happen in the keyword engine
+                out.extend(str(q) for q in top_df["query"].to_numpy()[:10])
+        return out or [topic]
+
+    keywords = _call_host(TRENDS_HOST, attempt, deadline)
+    if keywords is None:
+        count(f"{TRENDS_HOST}.fallbacks")
+        return [topic, f"{topic} review", f"best {topic}", f"{topic} price", f"{topic} vs alternatives"], False
+    return keywords, True
+
+
+def _scrape_competitors(
+    topic: str, limit: int = 5, deadline: Optional[float] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
     # DuckDuckGo HTML results endpoint (no API key)
     url = "https://duckduckgo.com/html/"
     params = {"q": f"{topic} competitors review"}
     headers = {"User-Agent": "Mozilla/5.0"}
-    try:
-        resp = requests.get(url, params=params, headers=headers, timeout=8)
+
+    def attempt() -> List[Dict[str, Any]]:
+        resp = requests.get(url, params=params, headers=headers, timeout=remaining(deadline, SCRAPE_TIMEOUT_SECONDS))
+        # DuckDuckGo answers rate-limited clients with 202/403 and a challenge page
+        if resp.status_code in THROTTLE_STATUSES:
+            raise _Throttled(str(resp.status_code))
         resp.raise_for_status()
         soup = BeautifulSoup(resp.text, "html.parser")
         results = []
@@ -73,25 +140,59 @@ def _scrape_competitors(topic: str, limit: int = 5) -> List[Dict[str, Any]]:
             if len(results) >= limit:
                 break
         return results
-    except Exception:
+
+    results = _call_host(DUCKDUCKGO_HOST, attempt, deadline)
+    if results is None:
         # Fallback examples
-        return [
-            {"title": f"Top {topic} alternatives", "url": "https://example.com/alt"},
-            {"title": f"Best {topic} in 2025", "url": "https://example.com/best"},
-        ]
+        count(f"{DUCKDUCKGO_HOST}.fallbacks")
+        return _fallback_competitors(topic), False
+    return results, True
 
 
-def run_research(topic: str, output_dir: str) -> Dict[str, Any]:
+def run_research(topic: str, output_dir: str, deadline: Optional[float] = None) -> Dict[str, Any]:
     # Run trends and competitor scrape in parallel for speed
-    with ThreadPoolExecutor(max_workers=2) as ex:
-        f1 = ex.submit(_fetch_trending_keywords, topic)
-        f2 = ex.submit(_scrape_competitors, topic)
-        trending_keywords = f1.result()
-        competitors = f2.result()
+    ex = ContextThreadPoolExecutor(max_workers=2)
+    f1 = ex.submit(_fetch_trending_keywords, topic, deadline=deadline)
+    f2 = ex.submit(_scrape_competitors, topic, deadline=deadline)
+    # Small grace so a call that times out on its own still returns its fallback
+    wait = None if deadline is None else remaining(deadline, float("inf")) + 1.0
+    try:
+        trending_keywords, trends_ok = f1.result(timeout=wait)
+    except FutureTimeout:
+        count(f"{TRENDS_HOST}.fallbacks")
+        trending_keywords, trends_ok = _fallback_keywords(topic), False
+    try:
+        competitors, competitors_ok = f2.result(
+            timeout=None if deadline is None else remaining(deadline, float("inf")) + 1.0
+        )
+    except FutureTimeout:
+        count(f"{DUCKDUCKGO_HOST}.fallbacks")
+        competitors, competitors_ok = _fallback_competitors(topic), False
+    # Don't wait on a straggler that already blew the budget
+    ex.shutdown(wait=False)
+
+    # One ranked keyword set from trends, fabricated variants and competitor headlines
+    titles = [c.get("title", "") for c in competitors]
+    ranked = rank_keywords(
+        topic,
+        [
+            (trending_keywords, 1.0 if trends_ok else 0.4),
+            ([p for t in titles for p in title_phrases(t, topic)], 0.6 if competitors_ok else 0.2),
+            (_fallback_keywords(topic), 0.3),
+        ],
+        documents=titles if competitors_ok else (),
+        limit=KEYWORD_LIMIT,
+    )
     research = {
         "topic": topic,
-        "trending_keywords": trending_keywords,
+        "trending_keywords": [k for k, _ in ranked] or trending_keywords,
+        "keyword_scores": dict(ranked),
         "competitors": competitors,
+        # Make fabricated fallback data visible instead of silently mixing it in
+        "sources": {
+            "trending_keywords": "google_trends" if trends_ok else "fallback",
+            "competitors": "duckduckgo" if competitors_ok else "fallback",
+        },
     }
     save_json(f"{output_dir}/research.json", research)
     return research
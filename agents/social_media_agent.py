@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+from utils.deadline import expired
 from utils.io_utils import save_json
 from utils.llm import LocalLLM
 
@@ -37,11 +38,17 @@ def _fallback_social(topic: str) -> Dict[str, List[str]]:
     return {"tweets": tweets, "linkedin_posts": linkedin, "instagram_captions": instagram}
 
 
-def generate_social(topic: str, blog_md: str, output_dir: str) -> Dict[str, Any]:
+def generate_social(
+    topic: str,
+    blog_md: str,
+    output_dir: str,
+    deadline: Optional[float] = None,
+    temperature: Optional[float] = None,
+) -> Dict[str, Any]:
     llm = LocalLLM()
-    if llm.is_available():
+    if llm.is_available() and not expired(deadline):
         prompt = _build_social_prompt(topic, blog_md)
-        raw = llm.generate(prompt, max_tokens=384)
+        raw = llm.generate(prompt, max_tokens=384, temperature=temperature, deadline=deadline)
         # Very light parsing for the structured list outputs
         tweets, linkedin, instagram = [], [], []
         bucket = None
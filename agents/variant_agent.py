@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+from agents.content_writer import generate_blog
+from agents.image_agent import generate_image
+from agents.social_media_agent import generate_social
+from utils.concurrency import ContextThreadPoolExecutor
+from utils.io_utils import save_json, save_text
+from utils.similarity import near_duplicates
+
+
+# Each variant is a full blog generation (plus section threads in sectional mode), so keep N small
+MAX_VARIANTS = 8
+
+
+def clamp_variants(n: int) -> int:
+    return max(1, min(int(n), MAX_VARIANTS))
+
+
+def _variant_workers(n: int) -> int:
+    return max(1, min(n, int(os.getenv("VARIANT_WORKERS", "4"))))
+
+
+def variant_temperatures(n: int) -> List[float]:
+    # Spread temperatures upward from the configured default so variants actually differ
+    base = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+    step = float(os.getenv("VARIANT_TEMPERATURE_STEP", "0.15"))
+    return [round(min(1.5, base + i * step), 3) for i in range(n)]
+
+
+def generate_blog_variants(
+    topic: str,
+    research: Dict[str, Any],
+    output_dir: str,
+    n: int,
+    deadline: Optional[float] = None,
+    mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    n = clamp_variants(n)
+    temps = variant_temperatures(n)
+    dirs = [os.path.join(output_dir, "variants", f"v{i + 1}") for i in range(n)]
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+    # One research result, N blog generations (at most VARIANT_WORKERS at a time)
+    with ContextThreadPoolExecutor(max_workers=_variant_workers(n)) as ex:
+        futures = [
+            ex.submit(generate_blog, topic, research, d, deadline=deadline, mode=mode, temperature=t)
+            for d, t in zip(dirs, temps)
+        ]
+        contents = [f.result() for f in futures]
+
+    threshold = float(os.getenv("VARIANT_DUP_THRESHOLD", "0.8"))
+    dup = near_duplicates([c["blog_md"] for c in contents], threshold=threshold)
+    dropped_idx = {i for i, _, _ in dup}
+    dropped = [
+        {"id": f"v{i + 1}", "duplicate_of": f"v{j + 1}", "similarity": sim} for i, j, sim in dup
+    ]
+    for i in dropped_idx:
+        # Near-duplicates never reach social or image generation
+        shutil.rmtree(dirs[i], ignore_errors=True)
+
+    kept = [
+        {"id": f"v{i + 1}", "output_dir": dirs[i], "temperature": temps[i], **contents[i]}
+        for i in range(n)
+        if i not in dropped_idx
+    ]
+    primary = kept[0]
+    save_text(f"{output_dir}/blog.md", primary["blog_md"])
+    save_json(f"{output_dir}/seo.json", primary["seo"])
+    save_json(f"{output_dir}/variants.json", {
+        "requested": n,
+        "kept": [{"id": v["id"], "temperature": v["temperature"]} for v in kept],
+        "dropped": dropped,
+    })
+    return {"blog_md": primary["blog_md"], "seo": primary["seo"], "variants": kept, "dropped": dropped}
+
+
+def generate_social_variants(
+    topic: str, content: Dict[str, Any], output_dir: str, deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    variants = content["variants"]
+    with ContextThreadPoolExecutor(max_workers=_variant_workers(len(variants))) as ex:
+        futures = {
+            v["id"]: ex.submit(
+                generate_social, topic, v["blog_md"], v["output_dir"], deadline=deadline, temperature=v["temperature"]
+            )
+            for v in variants
+        }
+        socials = {vid: f.result() for vid, f in futures.items()}
+    save_json(f"{output_dir}/social.json", socials[variants[0]["id"]])
+    return socials
+
+
+def generate_image_variants(
+    content: Dict[str, Any], output_dir: str, deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    # SD WebUI renders one image at a time anyway, so keep this sequential
+    images = {v["id"]: generate_image(v["blog_md"], v["output_dir"], deadline=deadline) for v in content["variants"]}
+    primary = images[content["variants"][0]["id"]]
+    if primary.get("hero_image"):
+        shutil.copyfile(primary["hero_image"], os.path.join(output_dir, "hero.png"))
+    return images
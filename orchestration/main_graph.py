@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from langgraph.graph import StateGraph, END  # type: ignore
 
@@ -8,44 +8,73 @@ from agents.research_agent import run_research
 from agents.content_writer import generate_blog
 from agents.social_media_agent import generate_social
 from agents.image_agent import generate_image
+from agents.variant_agent import generate_blog_variants, generate_image_variants, generate_social_variants
+from utils.profiling import RunProfiler
 
 
-def build_graph(include_image: bool = True):
+# Keys every node carries forward so downstream nodes always have them
+CARRIED_KEYS = ("topic", "output_dir", "deadline", "blog_mode", "variants")
+
+
+def _carry(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: state[k] for k in CARRIED_KEYS if k in state}
+
+
+def build_graph(include_image: bool = True, profiler: Optional[RunProfiler] = None):
     # State is a simple dictionary carried across nodes
     def research_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        topic = state["topic"]
-        out_dir = state["output_dir"]
-        research = run_research(topic, out_dir)
-        # Propagate essential keys forward so downstream nodes always have them
-        return {"topic": topic, "output_dir": out_dir, "research": research}
+        research = run_research(state["topic"], state["output_dir"], deadline=state.get("deadline"))
+        return {**_carry(state), "research": research}
 
     def content_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        topic = state["topic"]
-        out_dir = state["output_dir"]
-        research = state["research"]
-        content = generate_blog(topic, research, out_dir)
-        return {"topic": topic, "output_dir": out_dir, "content": content}
+        if state.get("variants", 1) > 1:
+            # Fan out N blogs from the one research result; near-duplicates are pruned here
+            content = generate_blog_variants(
+                state["topic"],
+                state["research"],
+                state["output_dir"],
+                state["variants"],
+                deadline=state.get("deadline"),
+                mode=state.get("blog_mode"),
+            )
+            return {**_carry(state), "content": content}
+        content = generate_blog(
+            state["topic"],
+            state["research"],
+            state["output_dir"],
+            deadline=state.get("deadline"),
+            mode=state.get("blog_mode"),
+        )
+        return {**_carry(state), "content": content}
 
     def social_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        topic = state["topic"]
-        out_dir = state["output_dir"]
+        if "variants" in state["content"]:
+            socials = generate_social_variants(
+                state["topic"], state["content"], state["output_dir"], deadline=state.get("deadline")
+            )
+            primary = state["content"]["variants"][0]["id"]
+            return {**_carry(state), "social": socials[primary], "social_variants": socials}
         blog_md = state["content"]["blog_md"]
-        social = generate_social(topic, blog_md, out_dir)
-        return {"topic": topic, "output_dir": out_dir, "social": social}
+        social = generate_social(state["topic"], blog_md, state["output_dir"], deadline=state.get("deadline"))
+        return {**_carry(state), "social": social}
 
     def image_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        topic = state["topic"]
-        out_dir = state["output_dir"]
+        if "variants" in state["content"]:
+            images = generate_image_variants(state["content"], state["output_dir"], deadline=state.get("deadline"))
+            primary = state["content"]["variants"][0]["id"]
+            return {**_carry(state), "images": images[primary], "image_variants": images}
         blog_md = state["content"]["blog_md"]
-        image = generate_image(blog_md, out_dir)
-        return {"topic": topic, "output_dir": out_dir, "images": image}
+        image = generate_image(blog_md, state["output_dir"], deadline=state.get("deadline"))
+        return {**_carry(state), "images": image}
 
-    graph = StateGraph(dict)
-    graph.add_node("research", research_node)
-    graph.add_node("content", content_node)
-    graph.add_node("social", social_node)
+    nodes = {"research": research_node, "content": content_node, "social": social_node}
     if include_image:
-        graph.add_node("image", image_node)
+        nodes["image"] = image_node
+
+    graph = StateGraph(dict)
+    for name, node in nodes.items():
+        # Profiling wraps each node without changing what it returns
+        graph.add_node(name, profiler.wrap(name, node) if profiler else node)
 
     graph.set_entry_point("research")
     graph.add_edge("research", "content")
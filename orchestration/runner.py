@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import copy
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from agents.variant_agent import clamp_variants
+from orchestration.main_graph import build_graph
+from utils.artifact_store import get_storage_mode, pack_run, read_json, read_text
+from utils.deadline import deadline_from_budget, expired
+from utils.io_utils import create_output_dir, get_output_root
+from utils.profiling import RunProfiler, should_profile
+from utils.singleflight import FileFlight, FlightTimeout, SingleFlight, flight_key
+from utils import transport
+
+
+COALESCE_MODES = ("shared", "copy", "off")
+
+# Non-artifact state kept in a compact bundle's manifest
+STATE_META_KEYS = ("topic", "blog_mode", "variants", "images", "image_variants")
+
+_flights = SingleFlight()
+
+
+def get_coalesce_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or os.getenv("COALESCE_MODE", "shared")).strip().lower()
+    return mode if mode in COALESCE_MODES else "shared"
+
+
+def load_run_state(output_dir: str) -> Optional[Dict[str, Any]]:
+    # Rebuild a final state from the artifacts a finished run leaves on disk (loose or packed)
+    blog_md = read_text(output_dir, "blog.md")
+    research = read_json(output_dir, "research.json")
+    social = read_json(output_dir, "social.json")
+    if blog_md is None or research is None or social is None:
+        return None
+    state: Dict[str, Any] = {
+        "topic": research.get("topic", ""),
+        "output_dir": output_dir,
+        "research": research,
+        "content": {"blog_md": blog_md, "seo": read_json(output_dir, "seo.json") or {}},
+        "social": social,
+    }
+    hero = os.path.join(output_dir, "hero.png")
+    if os.path.exists(hero):
+        state["images"] = {"status": "ok", "hero_image": hero}
+    return state
+
+
+def _store(state: Dict[str, Any], storage: Optional[str]) -> Dict[str, Any]:
+    # Compact mode: pack the finished run into one manifest backed by the shared blob store
+    if get_storage_mode(storage) == "compact":
+        meta = {k: state[k] for k in STATE_META_KEYS if k in state}
+        pack_run(state["output_dir"], meta=meta)
+    return state
+
+
+def _initial_state(topic: str, output_dir: str, extras: Dict[str, Any]) -> Dict[str, Any]:
+    # Optional run settings (deadline, blog mode, ...) only enter the state when set
+    state: Dict[str, Any] = {"topic": topic, "output_dir": output_dir}
+    state.update({k: v for k, v in extras.items() if v is not None})
+    return state
+
+
+def _execute(
+    topic: str,
+    output_dir: str,
+    include_image: bool,
+    extras: Dict[str, Any],
+    storage: Optional[str],
+    profile: bool,
+    wire: Dict[str, Any],
+) -> Dict[str, Any]:
+    cassette = transport.open_cassette(wire["mode"], output_dir, wire["cassette"], wire["speed"])
+    profiler = RunProfiler(output_dir) if profile else None
+    app = build_graph(include_image=include_image, profiler=profiler)
+    token = transport.activate(cassette) if cassette is not None else None
+    try:
+        state = app.invoke(_initial_state(topic, output_dir, extras))
+    finally:
+        # Deactivating writes the recorded cassette, so it is in place before packing
+        if token is not None:
+            transport.deactivate(token)
+        if profiler is not None:
+            profiler.close()
+    return _store(state, storage)
+
+
+def _invoke(
+    topic: str,
+    include_image: bool,
+    output_root: str,
+    extras: Dict[str, Any],
+    storage: Optional[str],
+    profile: bool,
+    wire: Dict[str, Any],
+) -> Dict[str, Any]:
+    output_dir = create_output_dir(topic, base_output_root=output_root)
+    return _execute(topic, output_dir, include_image, extras, storage, profile, wire)
+
+
+def _wait_seconds(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.time())
+
+
+def _run_leader(
+    key: str,
+    topic: str,
+    include_image: bool,
+    output_root: str,
+    extras: Dict[str, Any],
+    storage: Optional[str],
+    profile: bool,
+    wire: Dict[str, Any],
+) -> Tuple[Dict[str, Any], bool]:
+    # Another process may already be running the same topic against this output root
+    files = FileFlight(os.path.join(output_root, ".inflight"),
+                       stale_seconds=float(os.getenv("COALESCE_STALE_SECONDS", "1800")))
+    while True:
+        output_dir = create_output_dir(topic, base_output_root=output_root)
+        leader = files.claim(key, {"pid": os.getpid(), "topic": topic, "output_dir": output_dir})
+        if leader is None:
+            break
+        os.rmdir(output_dir)
+        files.wait(key, timeout=_wait_seconds(extras.get("deadline")))
+        done = load_run_state(leader.get("output_dir") or "")
+        if done:
+            return done, True
+        if expired(extras.get("deadline")):
+            # Budget spent waiting on another process's run: produce our own (degraded) output
+            return _invoke(topic, include_image, output_root, extras, storage, profile, wire), False
+        # Leader failed or went stale without finishing; try to take over
+    # Pack before releasing so followers in other processes see a complete run
+    with files.held(key):
+        return _execute(topic, output_dir, include_image, extras, storage, profile, wire), False
+
+
+def _copy_for_follower(state: Dict[str, Any], topic: str, output_root: str) -> Dict[str, Any]:
+    src = state["output_dir"]
+    dst = create_output_dir(topic, base_output_root=output_root)
+    shutil.copytree(src, dst, dirs_exist_ok=True)
+    return _rebase_paths(state, src, dst)
+
+
+def _rebase_paths(value: Any, src: str, dst: str) -> Any:
+    # Point every artifact path in the state (hero images, variant folders, ...) at the copy
+    if isinstance(value, dict):
+        return {k: _rebase_paths(v, src, dst) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_rebase_paths(v, src, dst) for v in value]
+    if isinstance(value, str) and (value == src or value.startswith(src + os.sep)):
+        return dst + value[len(src):]
+    return value
+
+
+def run_pipeline(
+    topic: str,
+    include_image: bool = True,
+    output_root: Optional[str] = None,
+    coalesce: Optional[str] = None,
+    budget_seconds: Optional[float] = None,
+    blog_mode: Optional[str] = None,
+    variants: int = 1,
+    storage: Optional[str] = None,
+    profile: Optional[bool] = None,
+    transport_mode: Optional[str] = None,
+    cassette: Optional[str] = None,
+    replay_speed: Optional[float] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """Run the graph for ``topic``, attaching to an identical in-flight run when coalescing is on.
+
+    Returns ``(final_state, coalesced)``. In ``shared`` mode followers get the leader's run folder;
+    in ``copy`` mode each follower gets its own folder with copies of the leader's artifacts.
+    ``budget_seconds`` (default ``RUN_BUDGET_SECONDS``) bounds the whole run; agents degrade to
+    fallback output once it is spent. A follower waits for the leader only within its own budget and
+    then runs on its own, so attaching to a slower run never overruns it. A non-positive budget
+    raises ``ValueError``. ``blog_mode`` selects single-call or sectional blog writing.
+    ``variants > 1`` generates that many blog/social variants from one research result (at most
+    ``MAX_VARIANTS``).
+    ``storage`` (default ``STORAGE_MODE``) set to ``compact`` packs the run into a deduplicated bundle.
+    ``profile`` writes per-node CPU/memory profiles into the run folder; when unset, a
+    ``PROFILE_SAMPLE_RATE`` fraction of runs is profiled. ``transport_mode`` (default
+    ``TRANSPORT_MODE``) set to ``record`` saves every outbound call to ``<run>/cassette.jsonl``;
+    ``replay`` serves them from ``cassette`` instead, sleeping the recorded latency times ``replay_speed``.
+    """
+    root = output_root or get_output_root()
+    mode = get_coalesce_mode(coalesce)
+    variants = clamp_variants(variants)
+    profile = should_profile(profile)
+    extras = {
+        "deadline": deadline_from_budget(budget_seconds),
+        "blog_mode": blog_mode,
+        "variants": variants if variants > 1 else None,
+    }
+    wire = {"mode": transport.get_transport_mode(transport_mode), "cassette": cassette, "speed": replay_speed}
+    if mode == "off":
+        return _invoke(topic, include_image, root, extras, storage, profile, wire), False
+
+    # Anything that changes what lands in the run folder is part of the key: storage layout, profiles,
+    # and recordings/replays, which must not attach to a live run of the same topic
+    key = flight_key(topic, include_image=include_image, output_root=os.path.abspath(root),
+                     blog_mode=blog_mode, variants=variants, storage=get_storage_mode(storage),
+                     profile=profile, transport=wire["mode"], cassette=cassette)
+    try:
+        (state, attached), shared = _flights.do(
+            key,
+            lambda: _run_leader(key, topic, include_image, root, extras, storage, profile, wire),
+            timeout=_wait_seconds(extras["deadline"]),
+        )
+    except FlightTimeout:
+        # A follower never waits past its own budget; it degrades to its own run instead
+        return _invoke(topic, include_image, root, extras, storage, profile, wire), False
+    if not (shared or attached):
+        return state, False
+    if mode == "copy":
+        return _copy_for_follower(state, topic, root), True
+    return copy.deepcopy(state), True
@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from agents.content_writer import BLOG_MODES
+from agents.variant_agent import MAX_VARIANTS
+from orchestration.runner import COALESCE_MODES
+from utils.artifact_store import STORAGE_MODES
+from utils.io_utils import get_output_root
+
+
+# run_pipeline keyword arguments a queued job may carry
+JOB_OPTIONS = ("include_image", "coalesce", "budget_seconds", "blog_mode", "variants", "storage", "profile")
+# How long a just-claimed file job may go without its lease details before it counts as abandoned
+CLAIM_GRACE_SECONDS = 60.0
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# option -> (check, what a valid value looks like)
+_OPTION_CHECKS: Dict[str, Tuple[Callable[[Any], bool], str]] = {
+    "include_image": (lambda v: isinstance(v, bool), "true or false"),
+    "coalesce": (lambda v: v in COALESCE_MODES, " | ".join(COALESCE_MODES)),
+    "budget_seconds": (lambda v: _is_number(v) and v > 0, "a positive number"),
+    "blog_mode": (lambda v: v in BLOG_MODES, " | ".join(BLOG_MODES)),
+    "variants": (lambda v: isinstance(v, int) and not isinstance(v, bool) and 1 <= v <= MAX_VARIANTS,
+                 f"an integer from 1 to {MAX_VARIANTS}"),
+    "storage": (lambda v: v in STORAGE_MODES, " | ".join(STORAGE_MODES)),
+    "profile": (lambda v: isinstance(v, bool), "true or false"),
+}
+
+
+def _check_options(options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Reject bad values at enqueue time; otherwise the job would fail on every retry
+    options = dict(options or {})
+    unknown = sorted(set(options) - set(JOB_OPTIONS))
+    if unknown:
+        raise ValueError(f"unknown job option(s): {', '.join(unknown)}")
+    for name, value in options.items():
+        check, expected = _OPTION_CHECKS[name]
+        if value is not None and not check(value):
+            raise ValueError(f"invalid {name}: {value!r} (expected {expected})")
+    return {k: v for k, v in options.items() if v is not None}
+
+
+class WorkQueue(ABC):
+    """Durable topic queue shared by workers on any number of machines.
+
+    A worker ``lease``s a job for ``lease_seconds`` and keeps it with ``heartbeat``. If the
+    heartbeats stop (crash, lost machine), the job becomes leasable again once the lease runs out.
+    ``fail`` puts a job back after ``retry_delay`` until it has used ``max_attempts``. ``complete``
+    and ``fail`` return False when the caller no longer holds the lease.
+    """
+
+    @abstractmethod
+    def enqueue(self, topic: str, options: Optional[Dict[str, Any]] = None, max_attempts: Optional[int] = None) -> str:
+        ...
+
+    @abstractmethod
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, job_id: str, worker: str, output_dir: str) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, job_id: str, worker: str, error: str, retry_delay: float = 0.0) -> bool:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+def _max_attempts(value: Optional[int]) -> int:
+    attempts = int(value if value is not None else os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+    if attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1, got {attempts}")
+    return attempts
+
+
+def _lease_view(job: Dict[str, Any], now: float) -> Dict[str, Any]:
+    return {
+        "id": job["id"],
+        "topic": job["topic"],
+        "worker": job.get("worker"),
+        "attempts": job.get("attempts", 0),
+        "expires_in": round(job["lease_expires"] - now, 1) if job.get("lease_expires") else None,
+    }
+
+
+class FileQueue(WorkQueue):
+    """Queue kept as one JSON file per job, moved between state folders with atomic renames.
+
+    Needs nothing but a shared directory, so it works on the network filesystem that already holds
+    ``OUTPUT_ROOT``. Pending file names start with their ready time so a sorted listing is FIFO.
+    Heartbeats touch the leased file and leases are judged on its mtime. "Now" is read the same
+    way, from the mtime of a freshly touched probe file, so every comparison uses the file server's
+    clock and skew between worker machines does not expire leases early.
+    """
+
+    STATES = ("pending", "leased", "done", "failed")
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        for state in self.STATES + ("tmp",):
+            os.makedirs(os.path.join(root, state), exist_ok=True)
+
+    def _dir(self, state: str) -> str:
+        return os.path.join(self.root, state)
+
+    def _write(self, path: str, job: Dict[str, Any]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self._dir("tmp"), suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _pending_path(self, job: Dict[str, Any]) -> str:
+        return os.path.join(self._dir("pending"), f"{int(job['available_at'] * 1000):015d}-{job['id']}.json")
+
+    def _leased_path(self, job_id: str) -> str:
+        return os.path.join(self._dir("leased"), f"{job_id}.json")
+
+    def _now(self) -> float:
+        # The file server's time, as stamped on a file we just touched
+        probe = os.path.join(self._dir("tmp"), ".clock")
+        with open(probe, "a", encoding="utf-8"):
+            pass
+        os.utime(probe)
+        return os.path.getmtime(probe)
+
+    def _expired(self, path: str, job: Dict[str, Any], now: float) -> bool:
+        return now - os.path.getmtime(path) > job.get("lease_seconds", CLAIM_GRACE_SECONDS)
+
+    def enqueue(self, topic: str, options: Optional[Dict[str, Any]] = None, max_attempts: Optional[int] = None) -> str:
+        now = self._now()
+        job = {
+            "id": uuid.uuid4().hex,
+            "topic": topic,
+            "options": _check_options(options),
+            "attempts": 0,
+            "max_attempts": _max_attempts(max_attempts),
+            "created_at": now,
+            "available_at": now,
+        }
+        self._write(self._pending_path(job), job)
+        return job["id"]
+
+    def _take(self, job_id: str, worker: Optional[str]) -> Optional[str]:
+        # Move a leased job out of reach of other workers/reclaimers before rewriting it
+        private = os.path.join(self._dir("tmp"), f"{job_id}.{uuid.uuid4().hex}.taken")
+        path = self._leased_path(job_id)
+        if worker is not None and (self._read(path) or {}).get("worker") != worker:
+            # Not ours: leave the lease file where its holder's heartbeats can find it
+            return None
+        try:
+            os.rename(path, private)
+        except FileNotFoundError:
+            return None
+        if worker is not None and (self._read(private) or {}).get("worker") != worker:
+            # Lease was reclaimed and handed to someone else; give it back
+            os.rename(private, path)
+            return None
+        return private
+
+    def _reclaim(self, now: float) -> None:
+        for name in os.listdir(self._dir("leased")):
+            path = os.path.join(self._dir("leased"), name)
+            job = self._read(path)
+            try:
+                if job is None or not self._expired(path, job, now):
+                    continue
+            except FileNotFoundError:
+                continue
+            private = self._take(job["id"], None)
+            if private is None:
+                continue
+            # A heartbeat may have landed between the check and the take (rename keeps the mtime)
+            job = self._read(private) or job
+            if not self._expired(private, job, now):
+                os.rename(private, path)
+                continue
+            self._settle(private, job, "lease expired", 0.0, now)
+
+    def _settle(self, private: str, job: Dict[str, Any], error: str, retry_delay: float, now: float) -> None:
+        job.update(worker=None, lease_expires=None, error=error, updated_at=now)
+        if job["attempts"] >= job["max_attempts"]:
+            self._write(os.path.join(self._dir("failed"), f"{job['id']}.json"), job)
+        else:
+            job["available_at"] = now + retry_delay
+            self._write(self._pending_path(job), job)
+        os.remove(private)
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        now = self._now()
+        self._reclaim(now)
+        ready_before = f"{int(now * 1000):015d}"
+        for name in sorted(os.listdir(self._dir("pending"))):
+            if name[:15] > ready_before:
+                break
+            job_id = name[16:-5]
+            pending = os.path.join(self._dir("pending"), name)
+            try:
+                # Fresh mtime first so reclaimers don't mistake the claimed file for an expired lease;
+                # the rename is the claim itself: exactly one worker wins it
+                os.utime(pending)
+                os.rename(pending, self._leased_path(job_id))
+            except FileNotFoundError:
+                continue
+            job = self._read(self._leased_path(job_id)) or {}
+            job.update(
+                worker=worker,
+                attempts=job.get("attempts", 0) + 1,
+                lease_seconds=lease_seconds,
+                lease_expires=now + lease_seconds,
+                updated_at=now,
+            )
+            self._write(self._leased_path(job_id), job)
+            return job
+        return None
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        path = self._leased_path(job_id)
+        job = self._read(path)
+        if job is None or job.get("worker") != worker:
+            return False
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def complete(self, job_id: str, worker: str, output_dir: str) -> bool:
+        private = self._take(job_id, worker)
+        if private is None:
+            return False
+        job = self._read(private) or {"id": job_id}
+        job.update(worker=worker, lease_expires=None, output_dir=output_dir, error=None, updated_at=self._now())
+        self._write(os.path.join(self._dir("done"), f"{job_id}.json"), job)
+        os.remove(private)
+        return True
+
+    def fail(self, job_id: str, worker: str, error: str, retry_delay: float = 0.0) -> bool:
+        private = self._take(job_id, worker)
+        if private is None:
+            return False
+        job = self._read(private) or {"id": job_id, "attempts": 0, "max_attempts": 1}
+        self._settle(private, job, error, retry_delay, self._now())
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._now()
+        pending = sorted(os.listdir(self._dir("pending")))
+        ready_before = f"{int(now * 1000):015d}"
+        ready = [n for n in pending if n[:15] <= ready_before]
+        leases = []
+        for name in os.listdir(self._dir("leased")):
+            path = os.path.join(self._dir("leased"), name)
+            job = self._read(path)
+            if job is None:
+                continue
+            try:
+                job["lease_expires"] = os.path.getmtime(path) + job.get("lease_seconds", CLAIM_GRACE_SECONDS)
+            except FileNotFoundError:
+                continue
+            leases.append(_lease_view(job, now))
+        return {
+            "backend": "file",
+            "depth": len(ready),
+            "delayed": len(pending) - len(ready),
+            "leased": len(leases),
+            "done": len(os.listdir(self._dir("done"))),
+            "failed": len(os.listdir(self._dir("failed"))),
+            "oldest_ready_seconds": round(now - int(ready[0][:15]) / 1000.0, 1) if ready else None,
+            "leases": leases,
+        }
+
+
+class SQLiteQueue(WorkQueue):
+    """Queue in one SQLite database; leases are taken inside ``BEGIN IMMEDIATE`` transactions.
+
+    Best on a single host or a filesystem with reliable POSIX locking (not most NFS mounts).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            topic TEXT NOT NULL,
+            options TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            worker TEXT,
+            lease_seconds REAL,
+            lease_expires REAL,
+            available_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            output_dir TEXT,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps the queue safe to share between threads
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def enqueue(self, topic: str, options: Optional[Dict[str, Any]] = None, max_attempts: Optional[int] = None) -> str:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, topic, options, status, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, 'pending', ?, ?, ?, ?)",
+                (job_id, topic, json.dumps(_check_options(options)), _max_attempts(max_attempts), now, now, now),
+            )
+        return job_id
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs whose worker stopped heartbeating go back to the queue (or fail when out of attempts)
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,"
+                " worker = NULL, lease_expires = NULL, available_at = ?, error = 'lease expired', updated_at = ?"
+                " WHERE status = 'leased' AND lease_expires < ?",
+                (now, now, now),
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'pending' AND available_at <= ?"
+                " ORDER BY available_at, created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, attempts = attempts + 1, lease_seconds = ?,"
+                " lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker, lease_seconds, now + lease_seconds, now, row["id"]),
+            )
+            job = self._job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+            conn.execute("COMMIT")
+            return job
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ? + lease_seconds, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (now, now, job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker: str, output_dir: str) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', lease_expires = NULL, output_dir = ?, error = NULL, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (output_dir, time.time(), job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str, retry_delay: float = 0.0) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,"
+                " worker = NULL, lease_expires = NULL, available_at = ?, error = ?, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (now + retry_delay, error, now, job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            ready = conn.execute(
+                "SELECT COUNT(*), MIN(available_at) FROM jobs WHERE status = 'pending' AND available_at <= ?", (now,)
+            ).fetchone()
+            leases = [self._job(r) for r in conn.execute("SELECT * FROM jobs WHERE status = 'leased'").fetchall()]
+        return {
+            "backend": "sqlite",
+            "depth": ready[0],
+            "delayed": counts.get("pending", 0) - ready[0],
+            "leased": len(leases),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_ready_seconds": round(now - ready[1], 1) if ready[1] else None,
+            "leases": [_lease_view(j, now) for j in leases],
+        }
+
+
+# URL scheme -> factory taking the part after "scheme://"
+QUEUE_BACKENDS: Dict[str, Callable[[str], WorkQueue]] = {
+    "file": FileQueue,
+    "sqlite": SQLiteQueue,
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], WorkQueue]) -> None:
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def open_queue(url: Optional[str] = None, output_root: Optional[str] = None) -> WorkQueue:
+    """Open the queue at ``url`` (default ``QUEUE_URL``, else a file queue in ``<output_root>/.queue``)."""
+    url = url or os.getenv("QUEUE_URL") or f"file://{os.path.join(output_root or get_output_root(), '.queue')}"
+    scheme, sep, location = url.partition("://")
+    if not sep or scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"unsupported queue url: {url} (known schemes: {', '.join(sorted(QUEUE_BACKENDS))})")
+    return QUEUE_BACKENDS[scheme](location)
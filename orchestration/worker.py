@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Dict, Optional
+
+from orchestration.runner import run_pipeline
+from orchestration.work_queue import WorkQueue
+
+
+# Tries to record a finished run before giving up (its lease then expires and it is redone)
+COMPLETE_ATTEMPTS = 5
+# Heartbeats that must come back "not held" in a row before a lease counts as lost; a file queue
+# briefly moves a lease file aside while another worker inspects it
+LOST_LEASE_CHECKS = 3
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class Worker:
+    """Leases topics from a shared queue and runs the graph for each, writing into ``output_root``.
+
+    A heartbeat thread renews the lease every third of ``lease_seconds`` while a run is in progress.
+    Failed runs go back to the queue with exponential backoff until the job is out of attempts.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        worker_id: Optional[str] = None,
+        output_root: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        poll_seconds: Optional[float] = None,
+    ) -> None:
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.output_root = output_root
+        self.lease_seconds = lease_seconds or float(os.getenv("QUEUE_LEASE_SECONDS", "120"))
+        self.poll_seconds = poll_seconds or float(os.getenv("QUEUE_POLL_SECONDS", "2"))
+        self.retry_base = float(os.getenv("QUEUE_RETRY_BASE_SECONDS", "30"))
+        self.retry_max = float(os.getenv("QUEUE_RETRY_MAX_SECONDS", "900"))
+        self.stop = threading.Event()
+
+    def _heartbeat(self, job_id: str, done: threading.Event) -> None:
+        interval = self.lease_seconds / 3.0
+        misses = 0
+        while not done.wait(interval if misses == 0 else min(1.0, interval / 10.0)):
+            try:
+                held = self.queue.heartbeat(job_id, self.worker_id)
+            except Exception as e:
+                # Transient queue error; the next beat may still land before the lease runs out
+                print(f"[{self.worker_id}] heartbeat for {job_id} failed: {e}")
+                continue
+            if held:
+                misses = 0
+                continue
+            misses += 1
+            if misses >= LOST_LEASE_CHECKS:
+                # Someone else holds the job now; our result will be discarded by complete()
+                print(f"[{self.worker_id}] lost lease on {job_id}")
+                return
+
+    def _fail(self, job: Dict[str, Any], error: Exception) -> None:
+        delay = min(self.retry_max, self.retry_base * 2 ** max(0, job.get("attempts", 1) - 1))
+        print(f"[{self.worker_id}] {job['topic']!r} failed (attempt {job.get('attempts')}): {error}")
+        traceback.print_exc()
+        try:
+            self.queue.fail(job["id"], self.worker_id, f"{type(error).__name__}: {error}", retry_delay=delay)
+        except Exception as e:
+            # The lease will expire and the job is retried anyway
+            print(f"[{self.worker_id}] could not record failure of {job['id']}: {e}")
+
+    def _complete(self, job: Dict[str, Any], output_dir: str) -> None:
+        # A finished run is expensive to redo: keep trying to record it while the lease is still held
+        delay = self.poll_seconds
+        for _ in range(COMPLETE_ATTEMPTS):
+            try:
+                if self.queue.complete(job["id"], self.worker_id, output_dir):
+                    print(f"[{self.worker_id}] {job['topic']!r} -> {output_dir}")
+                else:
+                    print(f"[{self.worker_id}] {job['topic']!r} finished after its lease was lost; "
+                          f"output kept at {output_dir}")
+                return
+            except Exception as e:
+                print(f"[{self.worker_id}] recording {job['id']} as done failed: {e}; retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.lease_seconds / 3.0)
+        print(f"[{self.worker_id}] gave up recording {job['id']} as done; output is at {output_dir}")
+
+    def run_one(self) -> bool:
+        """Lease and run one job. Returns False when nothing was ready."""
+        job = self.queue.lease(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job["id"], done), daemon=True)
+        beat.start()
+        try:
+            try:
+                options: Dict[str, Any] = dict(job.get("options") or {})
+                state, _ = run_pipeline(job["topic"], output_root=self.output_root, **options)
+            except Exception as e:
+                self._fail(job, e)
+                return True
+            # Heartbeats continue until completion is recorded
+            self._complete(job, state["output_dir"])
+        finally:
+            done.set()
+            beat.join()
+        return True
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_idle: bool = False) -> int:
+        """Work until stopped, ``max_jobs`` are processed, or (optionally) the queue is empty."""
+        processed = 0
+        while not self.stop.is_set() and (max_jobs is None or processed < max_jobs):
+            try:
+                worked = self.run_one()
+            except Exception as e:
+                # A locked database or a network filesystem hiccup must not end the worker thread
+                print(f"[{self.worker_id}] queue error: {e}")
+                self.stop.wait(self.poll_seconds)
+                continue
+            if worked:
+                processed += 1
+            elif exit_when_idle:
+                break
+            else:
+                self.stop.wait(self.poll_seconds)
+        return processed
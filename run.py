@@ -2,8 +2,12 @@ import argparse
 import os
 from dotenv import load_dotenv  # type: ignore
 
-from utils.io_utils import create_output_dir, save_json
-from orchestration.main_graph import build_graph
+from utils.io_utils import save_json
+from agents.content_writer import BLOG_MODES
+from agents.variant_agent import MAX_VARIANTS
+from orchestration.runner import COALESCE_MODES, run_pipeline
+from utils.artifact_store import STORAGE_MODES, get_storage_mode
+from utils.deadline import positive_budget
 
 
 def main() -> None:
@@ -13,17 +17,79 @@ def main() -> None:
     parser.add_argument("--topic", required=True, help="Product or topic to generate content for")
     parser.add_argument("--no-image", action="store_true", help="Skip image generation")
     parser.add_argument("--output-root", default=os.getenv("OUTPUT_ROOT", "outputs"), help="Root output directory")
+    parser.add_argument(
+        "--coalesce",
+        choices=COALESCE_MODES,
+        default=None,
+        help="Share an identical in-flight run: 'shared' folder, per-request 'copy', or 'off' (default: COALESCE_MODE or shared)",
+    )
+    parser.add_argument(
+        "--budget",
+        type=positive_budget,
+        default=None,
+        help="Time budget for the whole run in seconds (default: RUN_BUDGET_SECONDS or unlimited)",
+    )
+    parser.add_argument(
+        "--blog-mode",
+        choices=BLOG_MODES,
+        default=None,
+        help="'single' call or outline-first 'sectional' generation with parallel sections (default: BLOG_MODE or single)",
+    )
+    parser.add_argument(
+        "--variants",
+        type=int,
+        choices=range(1, MAX_VARIANTS + 1),
+        metavar="N",
+        default=1,
+        help=f"Generate N (1-{MAX_VARIANTS}) blog/social variants from one research result; near-duplicates are dropped",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_MODES,
+        default=None,
+        help="'files' or 'compact' deduplicated bundle per run (default: STORAGE_MODE or files)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=None,
+        help="Write per-node CPU samples and memory profiles into <run>/profile/",
+    )
+    wire = parser.add_mutually_exclusive_group()
+    wire.add_argument(
+        "--record",
+        action="store_true",
+        help="Record every outbound request/response with timings into <run>/cassette.jsonl",
+    )
+    wire.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        default=None,
+        help="Serve outbound calls from a recorded cassette file or run folder instead of the network",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=None,
+        help="Scale recorded latencies during replay: 1 = as recorded, 0 = instant (default: REPLAY_SPEED or 1)",
+    )
     args = parser.parse_args()
 
-    output_dir = create_output_dir(args.topic, base_output_root=args.output_root)
     include_image = not args.no_image
+    final_state, coalesced = run_pipeline(
+        args.topic, include_image=include_image, output_root=args.output_root, coalesce=args.coalesce,
+        budget_seconds=args.budget, blog_mode=args.blog_mode,
+        variants=args.variants, storage=args.storage, profile=args.profile,
+        transport_mode="record" if args.record else "replay" if args.replay else None,
+        cassette=args.replay, replay_speed=args.replay_speed,
+    )
+    output_dir = final_state["output_dir"]
 
-    app = build_graph(include_image=include_image)
-    # Initial state
-    state = {"topic": args.topic, "output_dir": output_dir}
-    final_state = app.invoke(state)
-
-    save_json(os.path.join(output_dir, "final_state.json"), final_state)
+    # Compact bundles already hold every artifact; final_state.json would only duplicate them
+    if get_storage_mode(args.storage) == "files":
+        save_json(os.path.join(output_dir, "final_state.json"), final_state)
+    if coalesced:
+        print("Attached to an identical in-flight run")
     print(f"Saved outputs to: {output_dir}")
 
 
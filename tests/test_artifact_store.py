@@ -0,0 +1,30 @@
+import os
+import time
+
+from utils.artifact_store import is_packed, migrate, read_json, read_text
+
+
+def _run(root, name, artifacts, age):
+    run_dir = os.path.join(str(root), name)
+    os.makedirs(run_dir)
+    for artifact, body in artifacts.items():
+        with open(os.path.join(run_dir, artifact), "w", encoding="utf-8") as f:
+            f.write(body)
+    old = time.time() - age
+    for artifact in artifacts:
+        os.utime(os.path.join(run_dir, artifact), (old, old))
+    return run_dir
+
+
+FINISHED = {"blog.md": "# Post", "research.json": "{}", "social.json": "{}", "final_state.json": '{"topic": "t"}'}
+
+
+def test_migrate_packs_only_finished_idle_runs(tmp_path):
+    done = _run(tmp_path, "done", FINISHED, age=7200)
+    fresh = _run(tmp_path, "fresh", FINISHED, age=0)
+    partial = _run(tmp_path, "partial", {"blog.md": "# Post"}, age=7200)
+
+    assert migrate(str(tmp_path), min_age_seconds=3600) == (1, 2)
+    assert is_packed(done) and not is_packed(fresh) and not is_packed(partial)
+    assert read_text(done, "blog.md") == "# Post"
+    assert read_json(done, "final_state.json") == {"topic": "t"}
@@ -0,0 +1,23 @@
+import time
+
+import pytest
+
+from utils.deadline import deadline_from_budget, expired, remaining
+
+
+def test_budget_sets_an_absolute_deadline(monkeypatch):
+    monkeypatch.delenv("RUN_BUDGET_SECONDS", raising=False)
+    assert deadline_from_budget() is None
+    deadline = deadline_from_budget(10)
+    assert 9 < deadline - time.time() <= 10
+    assert remaining(deadline, 3) == 3
+    assert not expired(deadline)
+
+
+@pytest.mark.parametrize("budget", [0, -5])
+def test_non_positive_budget_is_rejected(budget, monkeypatch):
+    with pytest.raises(ValueError):
+        deadline_from_budget(budget)
+    monkeypatch.setenv("RUN_BUDGET_SECONDS", str(budget))
+    with pytest.raises(ValueError):
+        deadline_from_budget()
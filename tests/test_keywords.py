@@ -0,0 +1,21 @@
+from utils.keywords import canonical_key, rank_keywords
+
+
+def test_canonical_key_ignores_order_plurals_and_stopwords():
+    assert canonical_key("water bottles for the gym") == canonical_key("gym water bottle")
+
+
+def test_canonical_key_keeps_intent_words():
+    assert canonical_key("best water bottles") != canonical_key("water bottle")
+
+
+def test_rank_keywords_dedupes_and_keeps_higher_prior_spelling():
+    ranked = rank_keywords(
+        "water bottle",
+        [(["Water Bottles"], 0.5), (["water bottle", "best water bottle"], 1.0)],
+        documents=["The best water bottle for hiking"],
+    )
+    keywords = [kw for kw, _ in ranked]
+    assert keywords.count("water bottle") == 1
+    assert "water bottles" not in keywords
+    assert "best water bottle" in keywords
@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+from utils.concurrency import ContextThreadPoolExecutor
+from utils.profiling import RunProfiler
+
+
+def test_overlapping_profilers_share_tracemalloc(tmp_path):
+    assert not tracemalloc.is_tracing()
+    a = RunProfiler(str(tmp_path / "a"), interval=0.01, trace_memory=True)
+    b = RunProfiler(str(tmp_path / "b"), interval=0.01, trace_memory=True)
+    inside = threading.Event()
+    a_closed = threading.Event()
+
+    def node(state):
+        inside.set()
+        # Run A finishes while B is still inside a node
+        assert a_closed.wait(5)
+        state["buf"] = [bytes(1024) for _ in range(100)]
+        return state
+
+    result = {}
+    t = threading.Thread(target=lambda: result.update(b.wrap("slow", node)({"x": 1})))
+    t.start()
+    assert inside.wait(5)
+    a.close()
+    a_closed.set()
+    t.join(5)
+
+    assert result["x"] == 1
+    assert tracemalloc.is_tracing()
+    b.close()
+    assert not tracemalloc.is_tracing()
+
+    with open(os.path.join(str(tmp_path / "b"), "profile", "summary.json"), encoding="utf-8") as f:
+        summary = json.load(f)
+    assert [n["node"] for n in summary["nodes"]] == ["slow"]
+    assert "tracemalloc_peak_kb" in summary["nodes"][0]
+    assert os.path.exists(os.path.join(str(tmp_path / "b"), "profile", "slow.alloc.txt"))
+
+
+def test_profiler_leaves_external_tracing_running(tmp_path):
+    tracemalloc.start()
+    try:
+        p = RunProfiler(str(tmp_path), interval=0.01, trace_memory=True)
+        p.wrap("n", lambda s: s)({})
+        p.close()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_profiling_failure_does_not_fail_node(tmp_path, monkeypatch):
+    p = RunProfiler(str(tmp_path), interval=0.01, trace_memory=False)
+    monkeypatch.setattr(p, "_write_node", lambda *a: (_ for _ in ()).throw(OSError("disk full")))
+    assert p.wrap("n", lambda s: {"ok": True})({}) == {"ok": True}
+    p.close()
+
+
+def _spin_in_pool_task(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+def _spin_in_other_run(stop):
+    while not stop.is_set():
+        pass
+
+
+def test_samples_follow_the_node_context_not_thread_timing(tmp_path):
+    p = RunProfiler(str(tmp_path), interval=0.005, trace_memory=False)
+    stop = threading.Event()
+
+    def node(state):
+        # A thread started meanwhile by someone else (another run) must not be charged to this node
+        threading.Thread(target=_spin_in_other_run, args=(stop,), daemon=True).start()
+        with ContextThreadPoolExecutor(max_workers=1) as ex:
+            ex.submit(_spin_in_pool_task, 0.3).result()
+        return state
+
+    try:
+        p.wrap("n", node)({})
+    finally:
+        stop.set()
+        p.close()
+    with open(os.path.join(str(tmp_path), "profile", "n.collapsed"), encoding="utf-8") as f:
+        stacks = f.read()
+    assert "_spin_in_pool_task" in stacks
+    assert "_spin_in_other_run" not in stacks
@@ -0,0 +1,88 @@
+import time
+
+import requests
+
+from agents import research_agent
+from utils import rate_limit
+from utils.rate_limit import HostLimiter
+
+
+def test_bucket_allows_burst_then_paces():
+    limiter = HostLimiter(rate=20.0, burst=2.0)
+    assert limiter.acquire(timeout=0)
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0)
+    start = time.monotonic()
+    assert limiter.acquire(timeout=1.0)
+    assert 0.02 < time.monotonic() - start < 0.5
+
+
+def test_throttle_halves_rate_and_success_adds_back():
+    limiter = HostLimiter(rate=1.0, burst=2.0, min_rate=0.1, max_rate=1.5, increase=0.25, recovery=0.0)
+    limiter.on_throttle()
+    assert limiter.rate == 0.5
+    assert not limiter.acquire(timeout=0)
+    limiter.on_success()
+    assert limiter.rate == 0.75
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == 1.5
+    for _ in range(10):
+        limiter.on_throttle()
+    assert limiter.rate == 0.1
+
+
+def test_throttled_rate_recovers_over_time():
+    limiter = HostLimiter(rate=1.0, recovery=10.0)
+    limiter.on_throttle()
+    assert limiter.rate < 1.0
+    time.sleep(0.1)
+    limiter.acquire(timeout=0)
+    assert limiter.rate == 1.0
+
+
+def test_error_returns_token_without_slowing_down():
+    limiter = HostLimiter(rate=0.01, burst=1.0)
+    assert limiter.acquire(timeout=0)
+    limiter.on_error()
+    assert limiter.rate == 0.01
+    assert limiter.acquire(timeout=0)
+
+
+def _fresh_host(monkeypatch, name):
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setenv("RESEARCH_MAX_ATTEMPTS", "3")
+    monkeypatch.setenv("RESEARCH_RATE_PER_SECOND", "20")
+    monkeypatch.setenv("RESEARCH_RATE_MAX_PER_SECOND", "40")
+    limiter = rate_limit.limiter_for(name)
+    return limiter, limiter.rate
+
+
+def test_call_host_falls_back_on_connection_error_without_retrying(monkeypatch):
+    limiter, rate = _fresh_host(monkeypatch, "offline.test")
+    calls = []
+
+    def attempt():
+        calls.append(1)
+        raise requests.ConnectionError("no network")
+
+    assert research_agent._call_host("offline.test", attempt) is None
+    assert len(calls) == 1
+    assert limiter.rate == rate
+
+
+def test_call_host_retries_throttled_attempts(monkeypatch):
+    limiter, rate = _fresh_host(monkeypatch, "busy.test")
+    calls = []
+
+    def attempt():
+        calls.append(1)
+        if len(calls) == 1:
+            resp = requests.Response()
+            resp.status_code = 429
+            raise requests.HTTPError("slow down", response=resp)
+        return "ok"
+
+    assert research_agent._call_host("busy.test", attempt) == "ok"
+    assert len(calls) == 2
+    assert limiter.rate < rate
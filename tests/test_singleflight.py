@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import FileFlight, FlightTimeout, SingleFlight, flight_key
+
+
+def test_flight_key_ignores_case_and_spacing():
+    assert flight_key("Water  Bottle", variants=1) == flight_key("water bottle", variants=1)
+    assert flight_key("water bottle", variants=1) != flight_key("water bottle", variants=2)
+
+
+def test_singleflight_leader_and_followers_share_one_call():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+
+    def call():
+        results.append(flights.do("k", work))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for t in followers:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results, key=lambda r: r[1]) == [("result", False)] + [("result", True)] * 3
+    # The key is free again once the leader finished
+    assert flights.do("k", lambda: "again") == ("again", False)
+
+
+def test_singleflight_error_reaches_leader_and_followers():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def boom():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flights.do("k", boom)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    assert started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert errors == ["boom", "boom"]
+    assert flights.do("k", lambda: 1) == (1, False)
+
+
+def test_fileflight_claim_release(tmp_path):
+    flight = FileFlight(str(tmp_path), stale_seconds=60)
+    assert flight.claim("k", {"pid": 1}) is None
+    assert flight.claim("k", {"pid": 2}) == {"pid": 1}
+    flight.release("k")
+    assert flight.wait("k")
+    assert flight.claim("k", {"pid": 2}) is None
+
+
+def test_fileflight_takes_over_stale_lock(tmp_path):
+    flight = FileFlight(str(tmp_path), stale_seconds=60)
+    assert flight.claim("k", {"pid": 1}) is None
+    lock = os.path.join(str(tmp_path), "k.lock")
+    old = time.time() - 120
+    os.utime(lock, (old, old))
+
+    assert flight.wait("k") is False
+    assert flight.claim("k", {"pid": 2}) is None
+    with open(lock, "r", encoding="utf-8") as f:
+        assert '"pid": 2' in f.read()
+
+
+def test_fileflight_held_keeps_long_runs_fresh(tmp_path):
+    flight = FileFlight(str(tmp_path), stale_seconds=0.3)
+    assert flight.claim("k", {"pid": 1}) is None
+    with flight.held("k"):
+        time.sleep(0.6)
+        assert flight.claim("k", {"pid": 2}) == {"pid": 1}
+    assert not os.path.exists(os.path.join(str(tmp_path), "k.lock"))
+
+
+def test_fileflight_stale_takeover_has_one_winner(tmp_path):
+    flight = FileFlight(str(tmp_path), stale_seconds=60)
+    flight.claim("k", {"pid": 0})
+    lock = os.path.join(str(tmp_path), "k.lock")
+    old = time.time() - 120
+    os.utime(lock, (old, old))
+    barrier = threading.Barrier(8)
+    winners = []
+
+    def contend(pid):
+        barrier.wait()
+        if flight.claim("k", {"pid": pid}) is None:
+            winners.append(pid)
+
+    threads = [threading.Thread(target=contend, args=(i + 1,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(winners) == 1
+    with open(lock, "r", encoding="utf-8") as f:
+        assert f'"pid": {winners[0]}' in f.read()
+
+
+def test_fileflight_wait_returns_when_released(tmp_path):
+    flight = FileFlight(str(tmp_path), stale_seconds=60, poll_seconds=0.01)
+    flight.claim("k", {})
+    timer = threading.Timer(0.1, flight.release, args=("k",))
+    timer.start()
+    assert flight.wait("k") is True
+    timer.join()
+
+
+def test_singleflight_follower_timeout():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "late"
+
+    leader = threading.Thread(target=flights.do, args=("k", slow))
+    leader.start()
+    assert started.wait(5)
+    begin = time.monotonic()
+    with pytest.raises(FlightTimeout):
+        flights.do("k", lambda: "never", timeout=0.1)
+    assert time.monotonic() - begin < 2
+    release.set()
+    leader.join(5)
+
+
+def test_fileflight_wait_timeout(tmp_path):
+    flight = FileFlight(str(tmp_path), stale_seconds=60, poll_seconds=0.01)
+    flight.claim("k", {})
+    assert flight.wait("k", timeout=0.05) is False
@@ -0,0 +1,84 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils import transport
+from utils.concurrency import ContextThreadPoolExecutor
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        _Handler.hits += 1
+        body = json.dumps({"path": self.path, "hit": _Handler.hits}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def _in_thread(fn):
+    # A plain thread starts with a fresh context, like a concurrent request in the web app
+    out = {}
+    t = threading.Thread(target=lambda: out.update(value=fn()))
+    t.start()
+    t.join(5)
+    return out["value"]
+
+
+def test_record_then_replay_offline(server, tmp_path):
+    cassette = transport.Cassette(str(tmp_path / "c.jsonl"), "record")
+    token = transport.activate(cassette)
+    try:
+        recorded = requests.get(server + "/a").json()
+        # Another run's traffic is not captured
+        _in_thread(lambda: requests.get(server + "/other").json())
+    finally:
+        transport.deactivate(token)
+
+    with open(tmp_path / "c.jsonl", encoding="utf-8") as f:
+        urls = [json.loads(line)["url"] for line in f]
+    assert urls == [server + "/a"]
+
+    token = transport.activate(transport.Cassette(str(tmp_path / "c.jsonl"), "replay", speed=0))
+    try:
+        assert requests.get(server + "/a").json() == recorded
+        with pytest.raises(requests.ConnectionError):
+            requests.get(server + "/unrecorded")
+        # A concurrent live run in the same process still reaches the network
+        live = _in_thread(lambda: requests.get(server + "/live").json())
+        assert live["path"] == "/live"
+    finally:
+        transport.deactivate(token)
+
+
+def test_cassette_follows_context_into_executor(server, tmp_path):
+    cassette = transport.Cassette(str(tmp_path / "c.jsonl"), "record")
+    token = transport.activate(cassette)
+    try:
+        with ContextThreadPoolExecutor(max_workers=2) as ex:
+            list(ex.map(lambda p: requests.get(server + p).status_code, ["/x", "/y"]))
+        with pytest.raises(transport.TransportBusy):
+            transport.activate(transport.Cassette(str(tmp_path / "d.jsonl"), "record"))
+    finally:
+        transport.deactivate(token)
+    assert not transport.replaying()
+    with open(tmp_path / "c.jsonl", encoding="utf-8") as f:
+        assert sorted(json.loads(line)["url"] for line in f) == [server + "/x", server + "/y"]
@@ -0,0 +1,56 @@
+import typing
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents.content_writer import BLOG_MODES
+from orchestration.runner import COALESCE_MODES
+from utils.artifact_store import STORAGE_MODES
+from utils.transport import TRANSPORT_MODES
+from web import app as web_app
+
+
+@pytest.fixture
+def client():
+    return TestClient(web_app.app)
+
+
+def _choices(field):
+    return typing.get_args(typing.get_args(web_app.RunRequest.model_fields[field].annotation)[0])
+
+
+def test_run_request_choices_match_the_pipeline():
+    assert _choices("coalesce") == COALESCE_MODES
+    assert _choices("blog_mode") == BLOG_MODES
+    assert _choices("storage") == STORAGE_MODES
+    assert _choices("transport") == TRANSPORT_MODES
+
+
+@pytest.mark.parametrize("option", [
+    {"blog_mode": "essay"},
+    {"storage": "zip"},
+    {"coalesce": "always"},
+    {"transport": "tape"},
+    {"budget_seconds": 0},
+    {"variants": 99},
+])
+def test_run_rejects_unknown_options(client, monkeypatch, option):
+    monkeypatch.setattr(web_app, "run_content_pipeline", lambda *a, **k: pytest.fail("pipeline ran"))
+    assert client.post("/run", json={"topic": "t", **option}).status_code == 422
+
+
+def test_run_rejects_replay_without_a_recording(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(web_app, "run_content_pipeline", lambda *a, **k: pytest.fail("pipeline ran"))
+    monkeypatch.delenv("REPLAY_CASSETTE", raising=False)
+    assert client.post("/run", json={"topic": "t", "transport": "replay"}).status_code == 400
+    monkeypatch.setenv("REPLAY_CASSETTE", str(tmp_path))
+    assert client.post("/run", json={"topic": "t", "transport": "replay"}).status_code == 400
+
+
+def test_run_failures_inside_the_pipeline_are_server_errors(monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("bad data deep inside an agent")
+
+    monkeypatch.setattr(web_app, "run_content_pipeline", broken)
+    client = TestClient(web_app.app, raise_server_exceptions=False)
+    assert client.post("/run", json={"topic": "t"}).status_code == 500
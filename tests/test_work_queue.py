@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+import pytest
+
+from orchestration.work_queue import FileQueue, SQLiteQueue, open_queue
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def queue(request, tmp_path):
+    if request.param == "file":
+        return FileQueue(str(tmp_path / "queue"))
+    return SQLiteQueue(str(tmp_path / "queue.db"))
+
+
+def _expire(queue, job_id):
+    # Age the lease instead of sleeping through it
+    if isinstance(queue, FileQueue):
+        path = queue._leased_path(job_id)
+        old = time.time() - 3600
+        os.utime(path, (old, old))
+    else:
+        with queue._connect() as conn:
+            conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job_id))
+
+
+def test_lease_complete(queue):
+    job_id = queue.enqueue("water bottle", {"variants": 2})
+    job = queue.lease("w1", 30)
+    assert job["id"] == job_id and job["topic"] == "water bottle"
+    assert job["options"] == {"variants": 2} and job["attempts"] == 1
+    assert queue.lease("w2", 30) is None
+    assert queue.heartbeat(job_id, "w1")
+    assert queue.complete(job_id, "w1", "/out/run")
+    stats = queue.stats()
+    assert (stats["depth"], stats["leased"], stats["done"]) == (0, 0, 1)
+
+
+def test_expired_lease_is_reclaimed_and_stale_worker_loses(queue):
+    job_id = queue.enqueue("t")
+    queue.lease("w1", 30)
+    _expire(queue, job_id)
+
+    job = queue.lease("w2", 30)
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1", "/out/stale")
+    assert not queue.fail(job_id, "w1", "late")
+    assert queue.complete(job_id, "w2", "/out/fresh")
+    assert queue.stats()["done"] == 1
+
+
+def test_fail_retries_after_delay_then_fails(queue):
+    job_id = queue.enqueue("t", max_attempts=2)
+    queue.lease("w", 30)
+    assert queue.fail(job_id, "w", "boom", retry_delay=0.2)
+    assert queue.lease("w", 30) is None
+    assert queue.stats()["delayed"] == 1
+    time.sleep(0.25)
+
+    assert queue.lease("w", 30)["attempts"] == 2
+    assert queue.fail(job_id, "w", "boom again")
+    assert queue.lease("w", 30) is None
+    stats = queue.stats()
+    assert (stats["depth"], stats["delayed"], stats["failed"]) == (0, 0, 1)
+
+
+def test_expired_lease_on_last_attempt_fails(queue):
+    job_id = queue.enqueue("t", max_attempts=1)
+    queue.lease("w1", 30)
+    _expire(queue, job_id)
+    assert queue.lease("w2", 30) is None
+    assert queue.stats()["failed"] == 1
+
+
+def test_concurrent_leases_never_double_claim(queue):
+    for i in range(50):
+        queue.enqueue(f"t{i}")
+    seen = []
+    lock = threading.Lock()
+
+    def work(name):
+        while True:
+            job = queue.lease(name, 30)
+            if job is None:
+                return
+            with lock:
+                seen.append(job["id"])
+            assert queue.complete(job["id"], name, "/out")
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert len(seen) == len(set(seen)) == 50
+
+
+def test_enqueue_rejects_bad_options(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("t", {"bogus": 1})
+    with pytest.raises(ValueError):
+        queue.enqueue("t", {"variants": "abc"})
+
+
+def test_enqueue_rejects_bad_max_attempts(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("t", max_attempts=0)
+
+
+def test_file_queue_leaves_other_workers_lease_in_place(tmp_path):
+    queue = FileQueue(str(tmp_path / "queue"))
+    job_id = queue.enqueue("t")
+    queue.lease("w1", 30)
+    assert not queue.complete(job_id, "w2", "/out/other")
+    assert not queue.fail(job_id, "w2", "not mine")
+    assert os.path.exists(queue._leased_path(job_id))
+    assert queue.heartbeat(job_id, "w1")
+
+
+def test_open_queue_schemes(tmp_path):
+    assert isinstance(open_queue(f"file://{tmp_path / 'q'}"), FileQueue)
+    assert isinstance(open_queue(f"sqlite://{tmp_path / 'q.db'}"), SQLiteQueue)
+    assert isinstance(open_queue(output_root=str(tmp_path)), FileQueue)
+    with pytest.raises(ValueError):
+        open_queue("redis://localhost")
@@ -0,0 +1,83 @@
+import sqlite3
+import time
+
+import orchestration.worker as worker_module
+from orchestration.work_queue import FileQueue
+from orchestration.worker import Worker
+
+
+class FlakyQueue(FileQueue):
+    """FileQueue whose first calls to selected methods raise like a locked database."""
+
+    def __init__(self, root, failures):
+        super().__init__(root)
+        self.failures = dict(failures)
+
+    def _maybe_fail(self, name):
+        if self.failures.get(name, 0) > 0:
+            self.failures[name] -= 1
+            raise sqlite3.OperationalError("database is locked")
+
+    def lease(self, *args, **kwargs):
+        self._maybe_fail("lease")
+        return super().lease(*args, **kwargs)
+
+    def complete(self, *args, **kwargs):
+        self._maybe_fail("complete")
+        return super().complete(*args, **kwargs)
+
+
+class BlinkingQueue(FileQueue):
+    """FileQueue whose first heartbeat misses, like a lease file briefly moved aside."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.beats = []
+
+    def heartbeat(self, job_id, worker):
+        held = bool(self.beats) and super().heartbeat(job_id, worker)
+        self.beats.append(held)
+        return held
+
+
+def _fake_pipeline(topic, output_root=None, **options):
+    return {"output_dir": f"{output_root}/{topic}"}, False
+
+
+def test_worker_survives_transient_queue_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(worker_module, "run_pipeline", _fake_pipeline)
+    queue = FlakyQueue(str(tmp_path / "q"), {"lease": 2, "complete": 2})
+    queue.enqueue("a")
+    queue.enqueue("b")
+    worker = Worker(queue, worker_id="w", output_root="out", lease_seconds=30, poll_seconds=0.01)
+
+    assert worker.run(max_jobs=2) == 2
+    stats = queue.stats()
+    assert stats["done"] == 2 and stats["depth"] == 0 and stats["leased"] == 0
+
+
+def test_failed_run_is_retried_then_fails(tmp_path, monkeypatch):
+    def broken(topic, **kwargs):
+        raise RuntimeError("backend down")
+
+    monkeypatch.setattr(worker_module, "run_pipeline", broken)
+    queue = FileQueue(str(tmp_path / "q"))
+    queue.enqueue("a", max_attempts=2)
+    worker = Worker(queue, worker_id="w", lease_seconds=30, poll_seconds=0.01)
+    worker.retry_base = 0.0
+
+    assert worker.run(max_jobs=2) == 2
+    stats = queue.stats()
+    assert stats["failed"] == 1 and stats["depth"] == 0
+
+
+def test_heartbeat_rides_out_a_missed_beat(tmp_path, monkeypatch):
+    monkeypatch.setattr(worker_module, "run_pipeline",
+                        lambda topic, output_root=None, **o: (time.sleep(0.5), _fake_pipeline(topic, output_root))[1])
+    queue = BlinkingQueue(str(tmp_path / "q"))
+    queue.enqueue("a")
+    worker = Worker(queue, worker_id="w", output_root="out", lease_seconds=0.3, poll_seconds=0.01)
+
+    assert worker.run_one()
+    assert queue.beats[0] is False and True in queue.beats
+    assert queue.stats()["done"] == 1
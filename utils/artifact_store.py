@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv  # type: ignore
+
+
+STORAGE_MODES = ("files", "compact")
+BUNDLE_NAME = "bundle.json"
+BLOB_DIR = ".blobs"
+# Binary media stays as loose files so it can be served statically
+LOOSE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+# Every agent has written its output once these exist (the image is optional)
+FINISHED_ARTIFACTS = ("blog.md", "research.json", "social.json")
+# A run folder untouched for this long is no longer being written to
+MIGRATE_MIN_AGE_SECONDS = 3600.0
+
+
+def get_storage_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or os.getenv("STORAGE_MODE", "files")).strip().lower()
+    return mode if mode in STORAGE_MODES else "files"
+
+
+def _blob_root(run_dir: str) -> str:
+    # Runs live directly under OUTPUT_ROOT, so sibling runs share one blob store
+    return os.path.join(os.path.dirname(os.path.abspath(run_dir)), BLOB_DIR)
+
+
+def _blob_path(run_dir: str, digest: str) -> str:
+    return os.path.join(_blob_root(run_dir), digest[:2], f"{digest}.gz")
+
+
+def _canonical_bytes(name: str, data: bytes) -> bytes:
+    # Compact, key-sorted JSON so identical content dedupes regardless of original formatting
+    if name.endswith(".json"):
+        try:
+            obj = json.loads(data.decode("utf-8"))
+            return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        except Exception:
+            pass
+    return data
+
+
+def _put_blob(run_dir: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(run_dir, digest)
+    if os.path.exists(path):
+        return digest
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(gzip.compress(data, compresslevel=6, mtime=0))
+    os.replace(tmp, path)
+    return digest
+
+
+def load_manifest(run_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(run_dir, BUNDLE_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def is_packed(run_dir: str) -> bool:
+    return os.path.exists(os.path.join(run_dir, BUNDLE_NAME))
+
+
+def pack_run(run_dir: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Move a run's text artifacts into the shared blob store and leave one small manifest."""
+    manifest = load_manifest(run_dir) or {"version": 1, "artifacts": {}}
+    packed: List[str] = []
+    for dirpath, _, filenames in os.walk(run_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, run_dir).replace(os.sep, "/")
+            if name == BUNDLE_NAME or filename.lower().endswith(LOOSE_SUFFIXES):
+                continue
+            with open(path, "rb") as f:
+                data = _canonical_bytes(name, f.read())
+            manifest["artifacts"][name] = {"sha256": _put_blob(run_dir, data), "size": len(data)}
+            packed.append(path)
+    if meta:
+        manifest["meta"] = meta
+    fd, tmp = tempfile.mkstemp(dir=run_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, os.path.join(run_dir, BUNDLE_NAME))
+    # Only drop loose copies once the manifest pointing at the blobs is in place
+    for path in packed:
+        os.remove(path)
+    for dirpath, _, _ in sorted(os.walk(run_dir), key=lambda w: -len(w[0])):
+        if dirpath != run_dir and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return manifest
+
+
+def read_artifact(run_dir: str, name: str) -> Optional[bytes]:
+    """Bytes of one artifact, from a loose file or lazily from the run's bundle."""
+    path = os.path.join(run_dir, *name.split("/"))
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except Exception:
+            return None
+    entry = ((load_manifest(run_dir) or {}).get("artifacts") or {}).get(name)
+    if not entry:
+        return None
+    try:
+        with open(_blob_path(run_dir, entry["sha256"]), "rb") as f:
+            return gzip.decompress(f.read())
+    except Exception:
+        return None
+
+
+def read_text(run_dir: str, name: str) -> Optional[str]:
+    data = read_artifact(run_dir, name)
+    return data.decode("utf-8") if data is not None else None
+
+
+def read_json(run_dir: str, name: str) -> Optional[Any]:
+    data = read_artifact(run_dir, name)
+    try:
+        return json.loads(data.decode("utf-8")) if data is not None else None
+    except Exception:
+        return None
+
+
+def list_artifacts(run_dir: str) -> List[str]:
+    names = set(((load_manifest(run_dir) or {}).get("artifacts") or {}).keys())
+    for dirpath, _, filenames in os.walk(run_dir):
+        for filename in filenames:
+            name = os.path.relpath(os.path.join(dirpath, filename), run_dir).replace(os.sep, "/")
+            if name != BUNDLE_NAME:
+                names.add(name)
+    return sorted(names)
+
+
+def _last_modified(run_dir: str) -> float:
+    latest = 0.0
+    for dirpath, _, filenames in os.walk(run_dir):
+        for filename in filenames:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(dirpath, filename)))
+            except FileNotFoundError:
+                continue
+    return latest
+
+
+def migrate(output_root: str, min_age_seconds: float = MIGRATE_MIN_AGE_SECONDS) -> Tuple[int, int]:
+    """Pack finished loose run folders under ``output_root``. Returns ``(packed, skipped)``.
+
+    A folder counts as finished when every agent's artifact is there and nothing in it changed for
+    ``min_age_seconds``, so runs still in progress (or just being written by another host) are left alone.
+    """
+    packed = skipped = 0
+    now = time.time()
+    for folder in sorted(os.listdir(output_root)):
+        run_dir = os.path.join(output_root, folder)
+        if folder.startswith(".") or not os.path.isdir(run_dir):
+            continue
+        # Already packed, incomplete, or still being written
+        finished = all(os.path.exists(os.path.join(run_dir, name)) for name in FINISHED_ARTIFACTS)
+        if not finished or now - _last_modified(run_dir) < min_age_seconds:
+            skipped += 1
+            continue
+        pack_run(run_dir)
+        packed += 1
+    return packed, skipped
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Compact run storage")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mig = sub.add_parser("migrate", help="Pack existing run folders into compact bundles")
+    mig.add_argument("--output-root", default=os.getenv("OUTPUT_ROOT", "outputs"), help="Root output directory")
+    mig.add_argument("--min-age", type=float, default=MIGRATE_MIN_AGE_SECONDS,
+                     help="Only pack runs untouched for this many seconds (skips runs still in progress)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        packed, skipped = migrate(args.output_root, min_age_seconds=args.min_age)
+        print(f"Packed {packed} run(s), skipped {skipped}")
+
+
+if __name__ == "__main__":
+    main()
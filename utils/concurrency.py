@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from utils.profiling import track_thread
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitter's context.
+
+    Plain executors start every task with an empty context, which would drop run-scoped
+    ContextVars such as the active record/replay cassette or the node being profiled.
+    """
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        # One copy per task: a Context can only be entered by one thread at a time
+        return super().submit(contextvars.copy_context().run, _tracked, fn, *args, **kwargs)
+
+
+def _tracked(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    with track_thread():
+        return fn(*args, **kwargs)
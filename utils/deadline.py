@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Optional
+
+
+# Below this many seconds a network call is not worth starting
+MIN_ATTEMPT_SECONDS = 0.5
+
+
+def positive_budget(value: str) -> float:
+    # argparse type for --budget: turns the ValueError into a usage error
+    budget = float(value)
+    if budget <= 0:
+        raise ValueError(value)
+    return budget
+
+
+def deadline_from_budget(budget_seconds: Optional[float] = None) -> Optional[float]:
+    # Absolute wall-clock deadline so it survives serialization and crosses process boundaries
+    if budget_seconds is None:
+        env = os.getenv("RUN_BUDGET_SECONDS", "").strip()
+        if not env:
+            return None
+        budget_seconds = float(env)
+    if budget_seconds <= 0:
+        # Unset means unlimited; a zero or negative budget is a mistake, not a way to say that
+        raise ValueError(f"budget must be positive, got {budget_seconds}")
+    return time.time() + budget_seconds
+
+
+def remaining(deadline: Optional[float], default: float) -> float:
+    """Timeout for the next attempt: ``default`` capped by what is left of the run budget."""
+    if deadline is None:
+        return default
+    return max(0.0, min(default, deadline - time.time()))
+
+
+def expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and deadline - time.time() < MIN_ATTEMPT_SECONDS
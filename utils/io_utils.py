@@ -27,8 +27,15 @@ def create_output_dir(topic: str, base_output_root: str | None = None) -> str:
     os.makedirs(root, exist_ok=True)
     folder = f"{get_timestamp()}_{slugify(topic)}"
     path = os.path.join(root, folder)
-    os.makedirs(path, exist_ok=True)
-    return path
+    # Runs of the same topic within one second would otherwise share a folder
+    suffix = 1
+    while True:
+        try:
+            os.makedirs(path)
+            return path
+        except FileExistsError:
+            suffix += 1
+            path = os.path.join(root, f"{folder}_{suffix}")
 
 
 def save_json(path: str, obj: dict) -> None:
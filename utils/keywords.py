@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or the to with your you 2024 2025".split()
+)
+# Separators competitor titles use between the headline and the site name
+_TITLE_SPLIT = re.compile(r"\s+[|\-–—:]\s+|[|:]")
+
+
+def normalize_keyword(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _terms(text: str) -> List[str]:
+    return [_stem(t) for t in normalize_keyword(text).split() if t not in STOPWORDS]
+
+
+def canonical_key(text: str) -> str:
+    # Word order, plurals and stopwords don't make a new keyword: "water bottles for the gym" == "gym water bottle".
+    # Intent words ("best", "review", "vs") are kept, since they are distinct searches
+    return " ".join(sorted(set(_terms(text))))
+
+
+def title_phrases(title: str, topic: str = "", max_words: int = 8) -> List[str]:
+    """Keyword-like phrases from a competitor headline (site names, off-topic fragments dropped)."""
+    topic_terms = set(_terms(topic))
+    out = []
+    for part in _TITLE_SPLIT.split(title or ""):
+        norm = normalize_keyword(part)
+        if not 2 <= len(norm.split()) <= max_words:
+            continue
+        if topic_terms and not topic_terms & set(_terms(norm)):
+            continue
+        out.append(norm)
+    return out
+
+
+def rank_keywords(
+    topic: str,
+    sources: Sequence[Tuple[Iterable[str], float]],
+    documents: Sequence[str] = (),
+    limit: int = 20,
+) -> List[Tuple[str, float]]:
+    """Merge, dedupe and rank keyword candidates.
+
+    ``sources`` pairs candidate keywords with a prior weight (e.g. real trends above fabricated
+    variants). Candidates are deduped on their canonical form, keeping the highest-prior spelling,
+    then scored by TF-IDF similarity to the topic and ``documents`` (competitor titles) plus how
+    often their terms co-occur in those documents.
+    """
+    best: Dict[str, Tuple[str, float]] = {}
+    for keywords, prior in sources:
+        for kw in keywords:
+            norm = normalize_keyword(kw)
+            key = canonical_key(norm)
+            if not key:
+                continue
+            if key not in best or prior > best[key][1]:
+                best[key] = (norm, prior)
+    if not best:
+        return []
+
+    keys = list(best)
+    docs = [topic, topic] + [d for d in documents if d]  # topic counts double in the centroid
+    vocab: Dict[str, int] = {}
+    for text in keys:
+        for t in text.split():
+            vocab.setdefault(t, len(vocab))
+    doc_terms = [[vocab[t] for t in set(_terms(d)) if t in vocab] for d in docs]
+
+    K = np.zeros((len(keys), len(vocab)), dtype=np.float32)
+    for i, text in enumerate(keys):
+        K[i, [vocab[t] for t in text.split()]] = 1.0
+    D = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+    for j, idx in enumerate(doc_terms):
+        if idx:
+            D[j, idx] = 1.0
+
+    n_docs = K.shape[0] + D.shape[0]
+    df = K.sum(axis=0) + D.sum(axis=0)
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+    Kw = K * idf
+    Kw /= np.linalg.norm(Kw, axis=1, keepdims=True) + 1e-9
+    centroid = (D * idf).sum(axis=0)
+    centroid /= np.linalg.norm(centroid) + 1e-9
+    relevance = Kw @ centroid
+
+    # Share of documents that contain at least half of each keyword's terms
+    if D.shape[0] > 2:
+        overlap = (K @ D[2:].T) / K.sum(axis=1, keepdims=True)
+        cooccurrence = (overlap >= 0.5).mean(axis=1)
+    else:
+        cooccurrence = np.zeros(len(keys), dtype=np.float32)
+
+    priors = np.array([best[k][1] for k in keys], dtype=np.float32)
+    scores = 0.6 * relevance + 0.25 * cooccurrence + 0.15 * priors
+    order = np.argsort(-scores, kind="stable")[:limit]
+    return [(best[keys[i]][0], round(float(scores[i]), 4)) for i in order]
@@ -1,15 +1,21 @@
 import os
+import threading
 from typing import Optional
 import requests
 
 try:
-    from llama_cpp import Llama  # type: ignore
+    from llama_cpp import Llama, StoppingCriteriaList  # type: ignore
 except Exception:  # pragma: no cover - optional dependency at runtime
     Llama = None  # type: ignore
+    StoppingCriteriaList = None  # type: ignore
+
+from utils.deadline import expired, remaining
+from utils.model_server import ModelServerClient
+from utils.transport import through
 
 
 class LocalLLM:
-    def __init__(self) -> None:
+    def __init__(self, use_server: bool = True) -> None:
         # Optional: allow selecting multiple models via comma-separated list
         self.model_candidates = [m.strip() for m in os.getenv("HF_MODELS", "").split(",") if m.strip()]
         # Optional cloud providers
@@ -30,8 +36,14 @@ class LocalLLM:
         self.max_tokens_default = int(os.getenv("LLM_MAX_TOKENS", "768"))
         self.temperature_default = float(os.getenv("LLM_TEMPERATURE", "0.7"))
 
+        # Optional shared model server: workers act as clients instead of loading the GGUF themselves
+        self.server_address = os.getenv("LLM_SERVER_ADDRESS") if use_server else None
+        self._client = ModelServerClient(self.server_address) if self.server_address else None
+
         self._llm = None
-        if self.model_path and os.path.exists(self.model_path) and Llama is not None:
+        # A llama.cpp context can only decode one request at a time
+        self._llm_lock = threading.Lock()
+        if self._client is None and self.model_path and os.path.exists(self.model_path) and Llama is not None:
             try:
                 self._llm = Llama(
                     model_path=self.model_path,
@@ -43,15 +55,33 @@ class LocalLLM:
                 self._llm = None
 
     def is_available(self) -> bool:
-        return bool(self.textgen_base_url or (self.hf_token and self.hf_model) or self._llm is not None)
+        return bool(
+            self.textgen_base_url
+            or (self.hf_token and self.hf_model)
+            or self._client is not None
+            or self._llm is not None
+        )
+
+    def has_local_model(self) -> bool:
+        return self._llm is not None
 
-    def generate(self, prompt: str, max_tokens: Optional[int] = None, temperature: Optional[float] = None) -> str:
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> str:
         # Truncate overly long prompts to avoid slow calls
         if len(prompt) > self.prompt_truncate_chars:
             prompt = prompt[: self.prompt_truncate_chars]
 
+        # Out of run budget: degrade to the fallback text rather than overrun
+        if expired(deadline):
+            return self._fallback_generate(prompt)
+
         # Prefer OpenAI-compatible endpoint if configured
-        if self.textgen_base_url and self.textgen_api_key:
+        if self.textgen_base_url and self.textgen_api_key and not expired(deadline):
             headers = {
                 "Authorization": f"Bearer {self.textgen_api_key}",
                 "Content-Type": "application/json",
@@ -65,7 +95,7 @@ class LocalLLM:
                     "max_tokens": max_tokens or self.max_tokens_default,
                     "temperature": self.temperature_default if temperature is None else temperature,
                 }
-                resp = requests.post(url, json=payload, headers=headers, timeout=self.hf_timeout)
+                resp = requests.post(url, json=payload, headers=headers, timeout=remaining(deadline, self.hf_timeout))
                 if resp.status_code < 400:
                     data = resp.json()
                     text = data.get("choices", [{}])[0].get("text", "").strip()
@@ -75,6 +105,8 @@ class LocalLLM:
                 pass
             # Try chat completions
             try:
+                if expired(deadline):
+                    raise TimeoutError("run deadline reached")
                 url = self.textgen_base_url.rstrip("/") + "/v1/chat/completions"
                 payload = {
                     "model": self.textgen_model,
@@ -85,7 +117,7 @@ class LocalLLM:
                     "max_tokens": max_tokens or self.max_tokens_default,
                     "temperature": self.temperature_default if temperature is None else temperature,
                 }
-                resp = requests.post(url, json=payload, headers=headers, timeout=self.hf_timeout)
+                resp = requests.post(url, json=payload, headers=headers, timeout=remaining(deadline, self.hf_timeout))
                 resp.raise_for_status()
                 data = resp.json()
                 text = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
@@ -101,6 +133,8 @@ class LocalLLM:
             models += [m for m in self.model_candidates if m not in models]
             last_err = None
             for model in models:
+                if expired(deadline):
+                    break
                 url = f"https://api-inference.huggingface.co/models/{model}"
                 headers = {
                     "Authorization": f"Bearer {self.hf_token}",
@@ -115,7 +149,7 @@ class LocalLLM:
                     },
                 }
                 try:
-                    resp = requests.post(url, json=payload, headers=headers, timeout=self.hf_timeout)
+                    resp = requests.post(url, json=payload, headers=headers, timeout=remaining(deadline, self.hf_timeout))
                     resp.raise_for_status()
                     data = resp.json()
                     if isinstance(data, list) and data and isinstance(data[0], dict):
@@ -131,20 +165,64 @@ class LocalLLM:
                     continue
             # Fall back if none succeeded
 
+        # Shared model server, if configured
+        if self._client is not None:
+            if expired(deadline):
+                return self._fallback_generate(prompt)
+            params = {
+                "prompt": prompt,
+                "max_tokens": max_tokens or self.max_tokens_default,
+                "temperature": self.temperature_default if temperature is None else temperature,
+            }
+            text = through(
+                "llm-server",
+                self.server_address or "",
+                params,
+                lambda: self._client.generate(**params, timeout=remaining(deadline, self._client.timeout)),
+            )
+            return text or self._fallback_generate(prompt)
+
         # Local llama.cpp backend
-        if self._llm is None:
+        if expired(deadline):
             return self._fallback_generate(prompt)
+        return self.complete_local(prompt, max_tokens, temperature, deadline) or self._fallback_generate(prompt)
+
+    def complete_local(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        """One completion from the in-process llama.cpp model; None if no model is loaded.
+
+        With a ``deadline``, waiting for the model counts against it and decoding stops (keeping the
+        text so far) once it is reached.
+        """
+        if self._llm is None:
+            return None
+        params = {
+            "prompt": prompt,
+            "max_tokens": max_tokens or self.max_tokens_default,
+            "temperature": self.temperature_default if temperature is None else temperature,
+        }
+
+        def complete() -> Optional[str]:
+            if not self._llm_lock.acquire(timeout=-1 if deadline is None else remaining(deadline, float("inf"))):
+                return None
+            try:
+                # Checked after every token, so a long generation can't run past the run budget
+                stopping = None if deadline is None else StoppingCriteriaList([lambda ids, logits: expired(deadline)])
+                response = self._llm.create_completion(**params, stop=["</s>"], stopping_criteria=stopping)
+            finally:
+                self._llm_lock.release()
+            try:
+                return response["choices"][0]["text"].strip()
+            except Exception:
+                return None
 
-        response = self._llm.create_completion(
-            prompt=prompt,
-            max_tokens=max_tokens or self.max_tokens_default,
-            temperature=self.temperature_default if temperature is None else temperature,
-            stop=["</s>"]
-        )
-        try:
-            return response["choices"][0]["text"].strip()
-        except Exception:
-            return self._fallback_generate(prompt)
+        # Recorded/replayed like HTTP calls so offline replays skip local decoding too
+        return through("llama-cpp", self.model_path or "", params, complete)
 
     def _fallback_generate(self, prompt: str) -> str:
         # Very simple deterministic fallback text, ensures project runs without a model
@@ -159,6 +237,10 @@ class LocalLLM:
                 "## Conclusion\n\n"
                 "A concise wrap-up with a call-to-action."
             )
+        if "BLOG_OUTLINE" in prompt:
+            return "TITLE: Sample Blog Post"
+        if "BLOG_SECTION" in prompt:
+            return "This is a locally generated placeholder section. Replace with a local LLM for richer content."
         if "SOCIAL_SNIPPETS" in prompt:
             return (
                 "TWEETS:\n- Tweet 1\n- Tweet 2\n- Tweet 3\n\n"
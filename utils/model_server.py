@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import argparse
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, Optional, Tuple, Union
+
+from dotenv import load_dotenv  # type: ignore
+
+
+Address = Union[str, Tuple[str, int]]
+
+
+def parse_address(value: str) -> Address:
+    # "host:port" for TCP, anything else is a Unix socket path
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return value
+
+
+def _authkey() -> Optional[bytes]:
+    # No default: multiprocessing.connection unpickles what authenticated peers send, so the key
+    # is the only thing keeping other local users (or the network) from running code in the server
+    key = os.getenv("LLM_SERVER_AUTHKEY", "")
+    return key.encode("utf-8") if key else None
+
+
+class ModelServerClient:
+    """Lightweight client for a model server; holds no model memory."""
+
+    def __init__(self, address: str, timeout: Optional[float] = None) -> None:
+        self.address = parse_address(address)
+        self.timeout = timeout if timeout is not None else float(os.getenv("LLM_SERVER_TIMEOUT_SECONDS", "300"))
+
+    def generate(
+        self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float] = None
+    ) -> Optional[str]:
+        authkey = _authkey()
+        if authkey is None:
+            return None
+        wait = self.timeout if timeout is None else timeout
+        # One short-lived connection per call keeps the client thread-safe. The deadline lets the
+        # server stop decoding once nobody is waiting for the answer
+        try:
+            with Client(self.address, authkey=authkey) as conn:
+                conn.send({"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature,
+                           "deadline": time.time() + wait})
+                if not conn.poll(wait):
+                    return None
+                reply = conn.recv()
+        except Exception:
+            return None
+        if not isinstance(reply, dict) or reply.get("error"):
+            return None
+        return reply.get("text") or None
+
+
+class ModelServer:
+    """Owns a single llama.cpp model and serves generation requests from a bounded queue."""
+
+    def __init__(self, address: str, queue_size: int = 64) -> None:
+        from utils.llm import LocalLLM
+
+        self.authkey = _authkey()
+        if self.authkey is None:
+            raise RuntimeError("LLM_SERVER_AUTHKEY must be set to a secret shared with the clients")
+        self.address = parse_address(address)
+        self.llm = LocalLLM(use_server=False)
+        if not self.llm.has_local_model():
+            raise RuntimeError("LLM_MODEL_PATH must point to a loadable GGUF model to run the model server")
+        self.requests: "queue.Queue[Tuple[Dict[str, Any], Any]]" = queue.Queue(maxsize=queue_size)
+
+    def _worker(self) -> None:
+        # llama.cpp contexts are not thread-safe: decode strictly one request at a time
+        while True:
+            req, conn = self.requests.get()
+            try:
+                text = self.llm.complete_local(
+                    req.get("prompt", ""),
+                    max_tokens=req.get("max_tokens"),
+                    temperature=req.get("temperature"),
+                    deadline=req.get("deadline"),
+                )
+                conn.send({"text": text} if text else {"error": "empty completion"})
+            except Exception as e:
+                try:
+                    conn.send({"error": str(e)})
+                except Exception:
+                    pass
+            finally:
+                conn.close()
+                self.requests.task_done()
+
+    def _handle(self, conn: Any) -> None:
+        try:
+            req = conn.recv()
+        except Exception:
+            conn.close()
+            return
+        try:
+            self.requests.put_nowait((req, conn))
+        except queue.Full:
+            # Clients fall back to templates rather than piling up behind a saturated model
+            conn.send({"error": "busy"})
+            conn.close()
+
+    def serve_forever(self) -> None:
+        threading.Thread(target=self._worker, daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"Model server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception:
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Shared llama.cpp model server")
+    parser.add_argument("--address", default=os.getenv("LLM_SERVER_ADDRESS") or "127.0.0.1:8765",
+                        help="host:port or Unix socket path to listen on")
+    parser.add_argument("--queue-size", type=int, default=int(os.getenv("LLM_SERVER_QUEUE_SIZE", "64")),
+                        help="Maximum pending requests before new ones are rejected")
+    args = parser.parse_args()
+
+    ModelServer(args.address, queue_size=args.queue_size).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
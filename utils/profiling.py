@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+try:
+    import resource  # type: ignore
+except Exception:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc is process-wide: overlapping profiled runs share it, and the last one out stops it
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+# Profiled nodes currently running in any run; the tracemalloc peak is only reset when none are
+_nodes_running = 0
+# The profiled node the current context belongs to; pool tasks inherit it with the context
+_current_node: contextvars.ContextVar[Optional["_NodeRun"]] = contextvars.ContextVar("profiled_node", default=None)
+
+
+def _acquire_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            # One frame per allocation keeps tracing overhead low enough for sampled production runs
+            tracemalloc.start(1)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        # Leave tracing alone if something other than the profilers started it
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+def _node_started() -> bool:
+    # True when no other node is running, i.e. resetting the process-wide peak clobbers nobody
+    global _nodes_running
+    with _tracemalloc_lock:
+        _nodes_running += 1
+        return _nodes_running == 1
+
+
+def _node_finished() -> None:
+    global _nodes_running
+    with _tracemalloc_lock:
+        _nodes_running -= 1
+
+
+@contextmanager
+def track_thread() -> Iterator[None]:
+    """Charge the calling thread's samples to the profiled node of the current context, if any."""
+    node = _current_node.get()
+    if node is None:
+        yield
+        return
+    tid = threading.get_ident()
+    node.threads.add(tid)
+    try:
+        yield
+    finally:
+        node.threads.discard(tid)
+
+
+def should_profile(requested: Optional[bool] = None) -> bool:
+    # Explicit request wins; otherwise sample a fraction of runs (PROFILE_SAMPLE_RATE, 0..1)
+    if requested is not None:
+        return requested
+    rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+    return rate > 0 and random.random() < rate
+
+
+def _rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except Exception:
+        return None
+
+
+def _peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _snapshot() -> Any:
+    # Leave the profiler's own bookkeeping out of the allocation report
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ])
+
+
+def _collapse(frame: Any) -> str:
+    parts: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class _NodeRun:
+    def __init__(self, name: str, thread_id: int) -> None:
+        self.name = name
+        self.thread_id = thread_id
+        # Pool threads currently working for this node (see track_thread)
+        self.threads: Set[int] = set()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+
+class RunProfiler:
+    """Per-run profiler: a low-rate stack sampler plus tracemalloc/RSS tracking around each graph node.
+
+    Writes ``profile/<node>.collapsed`` (flamegraph-ready collapsed stacks), ``profile/<node>.alloc.txt``
+    (top allocation sites during the node) and ``profile/summary.json`` into the run folder. Tasks a
+    node submits to a ``ContextThreadPoolExecutor`` carry the node in their context, so their stacks
+    are charged to it and never to another run's node. Memory figures (RSS, allocation diffs and the
+    tracemalloc peak) are process-wide and include any other run executing at the same time; the
+    peak is only reset when no other profiled node is running, so with overlap it is an upper bound.
+    Profiling errors are logged and never fail the node.
+    """
+
+    def __init__(self, output_dir: str, interval: Optional[float] = None, trace_memory: Optional[bool] = None) -> None:
+        self.dir = os.path.join(output_dir, "profile")
+        self.interval = interval if interval is not None else float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000.0
+        if trace_memory is None:
+            trace_memory = os.getenv("PROFILE_TRACEMALLOC", "1") not in ("0", "false", "False")
+        self.trace_memory = trace_memory
+        self.summary: List[Dict[str, Any]] = []
+        self._active: Dict[int, _NodeRun] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        os.makedirs(self.dir, exist_ok=True)
+        if self.trace_memory:
+            _acquire_tracemalloc()
+        self._sampler = threading.Thread(target=self._sample_loop, name="run-profiler", daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                nodes = list(self._active.values())
+            if not nodes:
+                continue
+            frames = sys._current_frames()
+            for node in nodes:
+                for tid in {node.thread_id, *node.threads}:
+                    frame = frames.get(tid)
+                    if frame is not None and tid != own:
+                        node.stacks[_collapse(frame)] += 1
+                        node.samples += 1
+
+    def wrap(self, name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+        def profiled(state: Dict[str, Any]) -> Dict[str, Any]:
+            tid = threading.get_ident()
+            node = _NodeRun(name, tid)
+            token = _current_node.set(node)
+            with self._lock:
+                self._active[tid] = node
+            before = None
+            if self.trace_memory:
+                alone = _node_started()
+                try:
+                    before = _snapshot()
+                    if alone:
+                        tracemalloc.reset_peak()
+                except Exception:
+                    logger.exception("profiler: memory snapshot before %s failed", name)
+            rss_start = _rss_kb()
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                return fn(state)
+            finally:
+                cpu = time.thread_time() - cpu
+                wall = time.perf_counter() - wall
+                with self._lock:
+                    self._active.pop(tid, None)
+                _current_node.reset(token)
+                self._finish(node, before, wall, cpu, rss_start)
+                if self.trace_memory:
+                    _node_finished()
+
+        return profiled
+
+    def _finish(self, node: _NodeRun, before: Any, wall: float, cpu: float, rss_start: Optional[int]) -> None:
+        try:
+            self._write_node(node, before, wall, cpu, rss_start)
+        except Exception:
+            logger.exception("profiler: writing profile for %s failed", node.name)
+
+    def _write_node(self, node: _NodeRun, before: Any, wall: float, cpu: float, rss_start: Optional[int]) -> None:
+        entry: Dict[str, Any] = {
+            "node": node.name,
+            "wall_seconds": round(wall, 4),
+            "thread_cpu_seconds": round(cpu, 4),
+            "samples": node.samples,
+            "rss_start_kb": rss_start,
+            "rss_end_kb": _rss_kb(),
+            "peak_rss_kb": _peak_rss_kb(),
+        }
+        with open(os.path.join(self.dir, f"{node.name}.collapsed"), "w", encoding="utf-8") as f:
+            for stack, n in node.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        if before is not None:
+            _, peak = tracemalloc.get_traced_memory()
+            entry["tracemalloc_peak_kb"] = peak // 1024
+            stats = _snapshot().compare_to(before, "lineno")
+            with open(os.path.join(self.dir, f"{node.name}.alloc.txt"), "w", encoding="utf-8") as f:
+                for stat in stats[: int(os.getenv("PROFILE_TOP_ALLOCATORS", "25"))]:
+                    f.write(f"{stat}\n")
+        with self._lock:
+            self.summary.append(entry)
+
+    def close(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._sampler.join(timeout=1.0)
+        if self.trace_memory:
+            _release_tracemalloc()
+        try:
+            with open(os.path.join(self.dir, "summary.json"), "w", encoding="utf-8") as f:
+                json.dump({"interval_seconds": self.interval, "nodes": self.summary}, f, ensure_ascii=False, indent=2)
+        except Exception:
+            logger.exception("profiler: writing summary to %s failed", self.dir)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+
+class HostLimiter:
+    """Token bucket whose refill rate adapts AIMD-style: additive increase on success,
+    multiplicative decrease when the host throttles.
+
+    Only real throttle signals lower the rate; plain errors (no network, DNS, parse failures) say
+    nothing about the host's limits. A lowered rate also climbs back toward its starting value by
+    ``recovery`` per second on its own, since the limiter lives as long as the process.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1.0,
+        min_rate: float = 0.02,
+        max_rate: Optional[float] = None,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        recovery: float = 0.05,
+    ) -> None:
+        self.rate = rate
+        self.base_rate = rate
+        self.recovery = recovery
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 4
+        self.increase = increase
+        self.decrease = decrease
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + elapsed * self.recovery)
+        self._last = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a token; callers queue here instead of hammering the host. False on timeout."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+                if end is not None:
+                    left = end - time.monotonic()
+                    if left <= 0:
+                        return False
+                    wait = min(wait, left)
+                self._cond.wait(wait)
+
+    def on_success(self) -> None:
+        with self._cond:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self._cond.notify_all()
+
+    def on_error(self) -> None:
+        # The request never reached a rate-limited answer: hand its token back, leave the rate alone
+        with self._cond:
+            self._refill()
+            self._tokens = min(self.burst, self._tokens + 1.0)
+            self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Drain the bucket so queued callers back off immediately
+            self._tokens = min(self._tokens, 0.0)
+
+
+_lock = threading.Lock()
+_limiters: Dict[str, HostLimiter] = {}
+_counters: Counter = Counter()
+
+
+def limiter_for(host: str) -> HostLimiter:
+    with _lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = HostLimiter(
+                rate=float(os.getenv("RESEARCH_RATE_PER_SECOND", "0.5")),
+                burst=float(os.getenv("RESEARCH_RATE_BURST", "2")),
+                max_rate=float(os.getenv("RESEARCH_RATE_MAX_PER_SECOND", "2")),
+            )
+            _limiters[host] = limiter
+        return limiter
+
+
+def count(event: str, n: int = 1) -> None:
+    with _lock:
+        _counters[event] += n
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "rates": {host: round(lim.rate, 4) for host, lim in _limiters.items()},
+        }
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from typing import List, Sequence, Set, Tuple
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_NUM_PERM = 64
+# Fixed seed so signatures are comparable across processes and runs
+_rng = random.Random(1337)
+_PERMS: List[Tuple[int, int]] = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(_NUM_PERM)
+]
+
+
+def shingles(text: str, k: int = 5) -> Set[str]:
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(text: str, k: int = 5) -> List[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+        for s in shingles(text, k)
+    ]
+    if not hashes:
+        return [_MERSENNE_PRIME] * _NUM_PERM
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMS]
+
+
+def similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two MinHash signatures."""
+    same = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return same / max(1, len(sig_a))
+
+
+def near_duplicates(texts: Sequence[str], threshold: float = 0.8) -> List[Tuple[int, int, float]]:
+    """Greedy pass keeping the first of each near-duplicate group.
+
+    Returns ``(dropped_index, kept_index, similarity)`` for every text that should be dropped.
+    """
+    sigs = [minhash(t) for t in texts]
+    kept: List[int] = []
+    dropped: List[Tuple[int, int, float]] = []
+    for i, sig in enumerate(sigs):
+        best = max(((similarity(sig, sigs[j]), j) for j in kept), default=(0.0, -1))
+        if best[0] >= threshold:
+            dropped.append((i, best[1], round(best[0], 3)))
+        else:
+            kept.append(i)
+    return dropped
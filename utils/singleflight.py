@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join((topic or "").lower().split())
+
+
+def flight_key(topic: str, **options: Any) -> str:
+    # Identical topic + options map to the same key regardless of case/spacing
+    payload = json.dumps({"topic": normalize_topic(topic), "options": options}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class FlightTimeout(Exception):
+    """A follower stopped waiting for the in-flight leader."""
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """In-process request coalescing: concurrent calls with the same key share one execution."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Run ``fn`` once per in-flight key. Returns ``(value, shared)``; ``shared`` is True for followers.
+
+        Followers wait at most ``timeout`` seconds for the leader, then get ``FlightTimeout``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        if not leader:
+            if not call.done.wait(timeout):
+                raise FlightTimeout(key)
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, False
+
+
+class FileFlight:
+    """Cross-process coalescing using exclusive lock files in a shared directory.
+
+    A leader keeps its lock fresh with ``held``; a lock whose mtime is older than ``stale_seconds``
+    belongs to a dead leader and may be taken over.
+    """
+
+    def __init__(self, lock_dir: str, stale_seconds: float = 1800.0, poll_seconds: float = 1.0) -> None:
+        self.lock_dir = lock_dir
+        self.stale_seconds = stale_seconds
+        self.poll_seconds = poll_seconds
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, f"{key}.lock")
+
+    def claim(self, key: str, info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Try to become the leader for ``key``. Returns None on success, else the leader's info."""
+        os.makedirs(self.lock_dir, exist_ok=True)
+        path = self._path(key)
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    seen = os.stat(path)
+                    if time.time() - seen.st_mtime > self.stale_seconds:
+                        # Leader died without releasing; take over
+                        self._break(path, seen)
+                        continue
+                    with open(path, "r", encoding="utf-8") as f:
+                        return json.load(f)
+                except (FileNotFoundError, ValueError):
+                    # Lock released or still being written; retry shortly
+                    time.sleep(0.05)
+                    continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            return None
+
+    def _break(self, path: str, seen: os.stat_result) -> None:
+        # Move the stale lock aside under a unique name: only one contender can move a given file,
+        # and the O_EXCL create that follows decides the new leader
+        aside = f"{path}.{uuid.uuid4().hex}.stale"
+        os.rename(path, aside)
+        moved = os.stat(aside)
+        if (moved.st_ino, moved.st_mtime) == (seen.st_ino, seen.st_mtime):
+            os.remove(aside)
+            return
+        # Another contender replaced the stale lock first and we moved its fresh one: put it back
+        try:
+            os.link(aside, path)
+        except FileExistsError:
+            pass
+        os.remove(aside)
+
+    def touch(self, key: str) -> None:
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def held(self, key: str) -> Iterator[None]:
+        """Refresh a claimed lock from a background thread while the body runs, then release it."""
+        stop = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(self.stale_seconds / 3.0):
+                try:
+                    self.touch(key)
+                except OSError:
+                    # A missed touch is fine; the next one lands well before the lock goes stale
+                    pass
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+            self.release(key)
+
+    def release(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def wait(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Block until the leader releases ``key``. False if the lock went stale or ``timeout`` ran out."""
+        path = self._path(key)
+        give_up = None if timeout is None else time.time() + timeout
+        while os.path.exists(path):
+            if give_up is not None and time.time() >= give_up:
+                return False
+            try:
+                if time.time() - os.path.getmtime(path) > self.stale_seconds:
+                    return False
+            except FileNotFoundError:
+                break
+            time.sleep(self.poll_seconds)
+        return True
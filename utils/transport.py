@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import base64
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.artifact_store import read_text
+
+
+TRANSPORT_MODES = ("live", "record", "replay")
+CASSETTE_NAME = "cassette.jsonl"
+
+_original_send = requests.Session.send
+_install_lock = threading.Lock()
+_installed = False
+# The cassette belongs to one run: it follows that run's context (and its ContextThreadPoolExecutor
+# tasks), so concurrent live runs in the same process never touch it
+_current: contextvars.ContextVar[Optional["Cassette"]] = contextvars.ContextVar("cassette", default=None)
+
+
+class TransportBusy(RuntimeError):
+    """A cassette is already active for this run."""
+
+
+def get_transport_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or os.getenv("TRANSPORT_MODE", "live")).strip().lower()
+    return mode if mode in TRANSPORT_MODES else "live"
+
+
+def open_cassette(
+    mode: Optional[str], output_dir: str, cassette: Optional[str] = None, speed: Optional[float] = None
+) -> Optional["Cassette"]:
+    """Cassette for a run: ``record`` writes ``<run>/cassette.jsonl``, ``replay`` reads ``cassette``."""
+    mode = get_transport_mode(mode)
+    if mode == "record":
+        return Cassette(os.path.join(output_dir, CASSETTE_NAME), "record")
+    if mode == "replay":
+        path = cassette or os.getenv("REPLAY_CASSETTE")
+        if not path:
+            raise ValueError("replay mode needs a cassette (file or recorded run folder)")
+        if speed is None:
+            speed = float(os.getenv("REPLAY_SPEED", "1.0"))
+        return Cassette(path, "replay", speed=speed)
+    return None
+
+
+def _key(kind: str, target: str, body: Any) -> str:
+    if isinstance(body, bytes):
+        raw = body
+    elif isinstance(body, str):
+        raw = body.encode("utf-8")
+    else:
+        raw = json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(kind.encode("utf-8") + b"\0" + target.encode("utf-8") + b"\0" + raw).hexdigest()
+
+
+class Cassette:
+    """Recorded outbound interactions (HTTP and local model calls) with their latencies.
+
+    Replay serves entries back in recorded order per request key; ``speed`` scales the recorded
+    latency (1.0 = as recorded, 0 = instant).
+    """
+
+    def __init__(self, path: str, mode: str, speed: float = 1.0) -> None:
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        if mode == "replay":
+            # A run folder works too, including compact ones whose cassette lives in the blob store
+            if os.path.isdir(path):
+                text = read_text(path, CASSETTE_NAME)
+                if text is None:
+                    raise FileNotFoundError(f"no {CASSETTE_NAME} in {path}")
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            for line in text.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._queues[entry["key"]].append(entry)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            entry["seq"] = len(self._entries)
+            self._entries.append(entry)
+
+    def take(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            queue = self._queues.get(key)
+            return queue.popleft() if queue else None
+
+    def wait(self, elapsed: float, timeout: Optional[float] = None) -> bool:
+        """Sleep for the (scaled) recorded latency. False if the caller's timeout would have hit first."""
+        delay = elapsed * self.speed
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def save(self) -> None:
+        if self.mode != "record":
+            return
+        with self._lock, open(self.path, "w", encoding="utf-8") as f:
+            for entry in self._entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _timeout_seconds(timeout: Any) -> Optional[float]:
+    if isinstance(timeout, (tuple, list)):
+        parts = [t for t in timeout if t is not None]
+        return float(sum(parts)) if parts else None
+    return float(timeout) if timeout is not None else None
+
+
+def _patched_send(self: requests.Session, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+    cassette = _current.get()
+    if cassette is None:
+        return _original_send(self, request, **kwargs)
+    key = _key("http", f"{request.method} {request.url}", request.body or b"")
+
+    if cassette.mode == "replay":
+        entry = cassette.take(key)
+        if entry is None:
+            # Unrecorded traffic behaves like being offline, so agents take their usual fallbacks
+            raise requests.ConnectionError(f"no recorded response for {request.method} {request.url}")
+        if not cassette.wait(entry["elapsed"], _timeout_seconds(kwargs.get("timeout"))):
+            raise requests.Timeout(f"replayed latency exceeded timeout for {request.url}")
+        if entry.get("error"):
+            raise getattr(requests, entry["error"], requests.RequestException)(entry.get("message", ""))
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        resp._content = base64.b64decode(entry["body_b64"])
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        resp.url = request.url or ""
+        resp.request = request
+        resp.reason = entry.get("reason") or ""
+        return resp
+
+    # Request headers are not stored: they carry API keys
+    entry: Dict[str, Any] = {"key": key, "kind": "http", "method": request.method, "url": request.url}
+    start = time.perf_counter()
+    try:
+        resp = _original_send(self, request, **kwargs)
+    except requests.RequestException as e:
+        entry.update(elapsed=time.perf_counter() - start, error=type(e).__name__, message=str(e))
+        cassette.add(entry)
+        raise
+    entry.update(
+        elapsed=time.perf_counter() - start,
+        status=resp.status_code,
+        reason=resp.reason,
+        # Body is already decoded, so drop transfer-level headers that no longer apply
+        headers={k: v for k, v in resp.headers.items() if k.lower() not in ("content-encoding", "transfer-encoding", "content-length")},
+        body_b64=base64.b64encode(resp.content).decode("ascii"),
+    )
+    cassette.add(entry)
+    return resp
+
+
+def _install() -> None:
+    # Installed once and left in place; with no cassette in the caller's context it is a pass-through
+    global _installed
+    with _install_lock:
+        if not _installed:
+            requests.Session.send = _patched_send  # type: ignore[method-assign]
+            _installed = True
+
+
+def activate(cassette: Cassette) -> contextvars.Token:
+    """Route the current context's outbound calls through ``cassette``; pass the token to ``deactivate``."""
+    if _current.get() is not None:
+        raise TransportBusy("this run is already recording or replaying")
+    _install()
+    return _current.set(cassette)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    cassette = _current.get()
+    _current.reset(token)
+    if cassette is not None:
+        cassette.save()
+
+
+def replaying() -> bool:
+    cassette = _current.get()
+    return cassette is not None and cassette.mode == "replay"
+
+
+def through(kind: str, target: str, request: Dict[str, Any], fn: Callable[[], Optional[str]]) -> Optional[str]:
+    """Record or replay a non-HTTP call (local llama.cpp, model server) that returns text."""
+    cassette = _current.get()
+    if cassette is None:
+        return fn()
+    key = _key(kind, target, request)
+    if cassette.mode == "replay":
+        entry = cassette.take(key)
+        if entry is None:
+            return None
+        cassette.wait(entry["elapsed"])
+        return entry.get("text")
+    start = time.perf_counter()
+    text = fn()
+    cassette.add({"key": key, "kind": kind, "url": target, "elapsed": time.perf_counter() - start, "text": text})
+    return text
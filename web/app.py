@@ -1,22 +1,38 @@
 from __future__ import annotations
 
+import asyncio
+import gzip
+import hashlib
+import json
 import os
-from typing import Any, Dict, List, Optional
-import shutil
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, List, Literal, Optional, Tuple
 import tempfile
+import zipfile
 from pathlib import Path
 
-from fastapi import FastAPI, Query
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv  # type: ignore
 
-from orchestration.main_graph import build_graph
-from utils.io_utils import create_output_dir
+from orchestration.runner import run_pipeline as run_content_pipeline
+from orchestration.work_queue import open_queue
+from utils.artifact_store import list_artifacts, read_artifact, read_json, read_text
+from utils.rate_limit import stats as research_stats
+from utils.transport import CASSETTE_NAME, get_transport_mode
 from agents.social_media_agent import generate_social
 from agents.image_agent import generate_image
+from agents.variant_agent import MAX_VARIANTS
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    brotli = None  # type: ignore
 
 
 load_dotenv()
@@ -39,24 +55,153 @@ app.mount("/outputs-static", StaticFiles(directory=OUTPUT_ROOT), name="outputs_s
 class RunRequest(BaseModel):
     topic: str
     no_image: bool = True
+    # Defaults to COALESCE_MODE
+    coalesce: Optional[Literal["shared", "copy", "off"]] = None
+    # Seconds the caller is willing to wait; defaults to RUN_BUDGET_SECONDS
+    budget_seconds: Optional[float] = Field(None, gt=0)
+    # Defaults to BLOG_MODE
+    blog_mode: Optional[Literal["single", "sectional"]] = None
+    # Number of A/B variants generated from one research result
+    variants: int = Field(1, ge=1, le=MAX_VARIANTS)
+    # Defaults to STORAGE_MODE
+    storage: Optional[Literal["files", "compact"]] = None
+    # Response fields to include (see RUN_FIELDS); final_state is only sent when asked for
+    fields: Optional[List[str]] = None
+    # Profile this run; when unset, PROFILE_SAMPLE_RATE decides
+    profile: Optional[bool] = None
+    # Defaults to TRANSPORT_MODE
+    transport: Optional[Literal["live", "record", "replay"]] = None
+    # Recorded run folder (under OUTPUT_ROOT) to replay from; defaults to REPLAY_CASSETTE
+    cassette: Optional[str] = None
+    # Multiplier on recorded latencies during replay; defaults to REPLAY_SPEED
+    replay_speed: Optional[float] = Field(None, ge=0)
+
+
+class EnqueueRequest(BaseModel):
+    topics: List[str]
+    # run_pipeline options applied to every topic (see JOB_OPTIONS)
+    options: Dict[str, Any] = {}
+    max_attempts: Optional[int] = None
+
+
+# Run artifacts exposed by the API: field -> (artifact name, reader)
+ARTIFACT_FIELDS = {
+    "blog_md": ("blog.md", read_text),
+    "seo": ("seo.json", read_json),
+    "social": ("social.json", read_json),
+    "research": ("research.json", read_json),
+    "variants": ("variants.json", read_json),
+}
+DETAIL_FIELDS = ("blog_md", "seo", "social", "research", "images")
+RUN_FIELDS = DETAIL_FIELDS + ("variants", "coalesced", "final_state")
+MEDIA_TYPES = {".md": "text/markdown; charset=utf-8", ".json": "application/json", ".png": "image/png"}
+COMPRESS_MIN_BYTES = 1024
+
+
+class _DetailsCache:
+    """Small LRU of parsed run details, validated against the run folder's signature."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, folder: str, etag: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items.get(folder)
+            if item is None or item[0] != etag:
+                return None
+            self._items.move_to_end(folder)
+            return item[1]
+
+    def put(self, folder: str, etag: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._items[folder] = (etag, data)
+            self._items.move_to_end(folder)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, folder: str) -> None:
+        with self._lock:
+            self._items.pop(folder, None)
+
+
+_details_cache = _DetailsCache(int(os.getenv("DETAILS_CACHE_SIZE", "128")))
+
+
+def _run_signature(run_dir: str) -> Tuple[str, float]:
+    # Any write to the run folder (artifacts, bundle manifest, hero image) changes size or mtime
+    entries = sorted(
+        (e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in os.scandir(run_dir) if e.is_file()
+    )
+    etag = 'W/"' + hashlib.sha1(repr(entries).encode("utf-8")).hexdigest()[:20] + '"'
+    last_modified = max((m for _, m, _ in entries), default=0) / 1e9
+    return etag, last_modified
 
 
-def _read_file(path: str) -> Optional[str]:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-    except Exception:
-        return None
+def _variant_etag(etag: str, variant: str) -> str:
+    return etag[:-1] + "-" + hashlib.sha1(variant.encode("utf-8")).hexdigest()[:8] + '"'
 
 
-def _read_json(path: str) -> Optional[Dict[str, Any]]:
-    import json
+def _cache_headers(etag: str, last_modified: float) -> Dict[str, str]:
+    # no-cache: clients may store the response but must revalidate, which is a cheap 304
+    return {"ETag": etag, "Last-Modified": formatdate(last_modified, usegmt=True), "Cache-Control": "no-cache"}
 
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
+
+def _not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm:
+        return inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(ims).timestamp()
+        except Exception:
+            return False
+    return False
+
+
+def _select_fields(fields: Optional[List[str]], allowed: Tuple[str, ...], default: Tuple[str, ...]) -> Tuple[str, ...]:
+    if not fields:
+        return default
+    wanted = {f.strip() for item in fields for f in item.split(",") if f.strip()}
+    return tuple(f for f in allowed if f in wanted)
+
+
+def _encoded_response(
+    request: Request, body: bytes, media_type: str, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    # Brotli when available and accepted, gzip otherwise; tiny bodies aren't worth it
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    accept = request.headers.get("accept-encoding", "").lower()
+    compressible = media_type.startswith("text/") or media_type == "application/json"
+    if compressible and len(body) >= COMPRESS_MIN_BYTES:
+        if brotli is not None and "br" in accept:
+            body = brotli.compress(body, quality=5)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accept:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _json_response(request: Request, data: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _encoded_response(request, body, "application/json", headers)
+
+
+def _hero_url(folder: str, run_dir: str) -> Optional[str]:
+    return f"/outputs-static/{folder}/hero.png" if os.path.exists(os.path.join(run_dir, "hero.png")) else None
+
+
+def _load_details(folder: str, run_dir: str, etag: str) -> Dict[str, Any]:
+    data = _details_cache.get(folder, etag)
+    if data is None:
+        data = {name: reader(run_dir, artifact) for name, (artifact, reader) in ARTIFACT_FIELDS.items()}
+        data["images"] = {"hero_url": _hero_url(folder, run_dir)}
+        _details_cache.put(folder, etag, data)
+    return data
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -221,11 +366,36 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/stats")
+async def stats() -> Dict[str, Any]:
+    # Per-host request/throttle/fallback counters and current adaptive rates for research scraping
+    return {"research": research_stats()}
+
+
+@app.post("/queue")
+async def enqueue_topics(req: EnqueueRequest) -> JSONResponse:
+    # Hand topics to `python worker.py work` processes instead of running them in this process
+    try:
+        queue = open_queue()
+        ids = [queue.enqueue(topic, req.options, max_attempts=req.max_attempts) for topic in req.topics]
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return JSONResponse(status_code=202, content={"jobs": dict(zip(ids, req.topics))})
+
+
+@app.get("/queue/stats")
+async def queue_stats() -> Dict[str, Any]:
+    # Queue depth, retry backlog and who holds which lease
+    return await asyncio.to_thread(lambda: open_queue().stats())
+
+
 @app.get("/outputs/list")
 async def list_outputs() -> Dict[str, List[str]]:
     root = os.getenv("OUTPUT_ROOT", "outputs")
     try:
-        items = sorted([f for f in os.listdir(root) if os.path.isdir(os.path.join(root, f))])
+        items = sorted([
+            f for f in os.listdir(root) if not f.startswith(".") and os.path.isdir(os.path.join(root, f))
+        ])
         return {"outputs": items}
     except Exception:
         return {"outputs": []}
@@ -243,25 +413,42 @@ def _safe_join_output(folder: str) -> Optional[str]:
 
 
 @app.get("/outputs/details")
-async def output_details(folder: str) -> JSONResponse:
+async def output_details(
+    request: Request,
+    folder: str,
+    fields: Optional[List[str]] = Query(None, description="Comma-separated subset of blog_md, seo, social, research, images"),
+) -> Response:
     safe = _safe_join_output(folder)
     if not safe:
         return JSONResponse(status_code=400, content={"error": "invalid folder"})
-    blog_path = os.path.join(safe, "blog.md")
-    seo_path = os.path.join(safe, "seo.json")
-    social_path = os.path.join(safe, "social.json")
-    research_path = os.path.join(safe, "research.json")
-    data = {
-        "folder": folder,
-        "blog_md": _read_file(blog_path),
-        "seo": _read_json(seo_path),
-        "social": _read_json(social_path),
-        "research": _read_json(research_path),
-        "images": {
-            "hero_url": f"/outputs-static/{folder}/hero.png" if os.path.exists(os.path.join(safe, "hero.png")) else None
-        }
-    }
-    return JSONResponse(content=data)
+    run_etag, last_modified = _run_signature(safe)
+    selected = _select_fields(fields, DETAIL_FIELDS, DETAIL_FIELDS)
+    # Field selection changes the body, so it is part of the validator
+    etag = run_etag if selected == DETAIL_FIELDS else _variant_etag(run_etag, ",".join(selected))
+    headers = _cache_headers(etag, last_modified)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    details = _load_details(folder, safe, run_etag)
+    data = {"folder": folder, **{f: details[f] for f in selected}}
+    return _json_response(request, data, headers)
+
+
+@app.get("/outputs/artifact")
+async def output_artifact(request: Request, folder: str, name: str) -> Response:
+    # Single artifact (e.g. blog.md) with conditional GET and compression, for clients that need just one
+    safe = _safe_join_output(folder)
+    if not safe or name not in list_artifacts(safe):
+        return JSONResponse(status_code=404, content={"error": "artifact not found"})
+    run_etag, last_modified = _run_signature(safe)
+    etag = _variant_etag(run_etag, name)
+    headers = _cache_headers(etag, last_modified)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    body = read_artifact(safe, name)
+    if body is None:
+        return JSONResponse(status_code=404, content={"error": "artifact not found"})
+    media_type = MEDIA_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+    return _encoded_response(request, body, media_type, headers)
 
 
 @app.get("/outputs/zip")
@@ -270,36 +457,56 @@ async def zip_output(folder: str):
     if not safe:
         return JSONResponse(status_code=400, content={"error": "invalid folder"})
     tmp_dir = tempfile.mkdtemp()
-    zip_base = os.path.join(tmp_dir, folder)
-    archive = shutil.make_archive(zip_base, 'zip', root_dir=safe)
+    archive = os.path.join(tmp_dir, f"{folder}.zip")
+    # Expand compact bundles so the download looks the same in either storage mode
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name in list_artifacts(safe):
+            data = read_artifact(safe, name)
+            if data is not None:
+                zf.writestr(name, data)
     filename = os.path.basename(archive)
     return FileResponse(archive, media_type='application/zip', filename=filename)
 
 @app.post("/run")
-async def run_pipeline(req: RunRequest) -> JSONResponse:
+async def run_pipeline(request: Request, req: RunRequest) -> Response:
     include_image = not req.no_image
-    output_dir = create_output_dir(req.topic)
-    app_graph = build_graph(include_image=include_image)
-    state = {"topic": req.topic, "output_dir": output_dir}
-    final_state = app_graph.invoke(state)
-
-    blog_path = os.path.join(output_dir, "blog.md")
-    seo_path = os.path.join(output_dir, "seo.json")
-    social_path = os.path.join(output_dir, "social.json")
-    research_path = os.path.join(output_dir, "research.json")
-
-    data = {
-        "output_dir": output_dir,
-        "blog_md": _read_file(blog_path),
-        "seo": _read_json(seo_path),
-        "social": _read_json(social_path),
-        "research": _read_json(research_path),
-        "final_state": final_state,
-        "images": {
-            "hero_url": f"/outputs-static/{os.path.basename(output_dir)}/hero.png" if os.path.exists(os.path.join(output_dir, "hero.png")) else None
-        }
-    }
-    return JSONResponse(content=data)
+    cassette = None
+    if req.cassette:
+        cassette = _safe_join_output(req.cassette)
+        if not cassette:
+            return JSONResponse(status_code=400, content={"error": "invalid cassette folder"})
+    # Checked up front so a bad request is a 400 and anything failing inside the run is a 500
+    if get_transport_mode(req.transport) == "replay":
+        source = cassette or os.getenv("REPLAY_CASSETTE")
+        if not source:
+            return JSONResponse(status_code=400, content={"error": "replay needs a cassette (recorded run folder)"})
+        if not (os.path.isfile(source) or (os.path.isdir(source) and CASSETTE_NAME in list_artifacts(source))):
+            return JSONResponse(status_code=400, content={"error": f"no {CASSETTE_NAME} in {req.cassette or source}"})
+    # Run off the event loop so identical concurrent requests can attach to one pipeline
+    final_state, coalesced = await asyncio.to_thread(
+        run_content_pipeline, req.topic, include_image=include_image, coalesce=req.coalesce,
+        budget_seconds=req.budget_seconds, blog_mode=req.blog_mode,
+        variants=req.variants, storage=req.storage, profile=req.profile,
+        transport_mode=req.transport, cassette=cassette, replay_speed=req.replay_speed,
+    )
+    output_dir = final_state["output_dir"]
+    folder = os.path.basename(output_dir)
+    _details_cache.invalidate(folder)
+
+    # final_state repeats every artifact, so it is opt-in
+    selected = _select_fields(req.fields, RUN_FIELDS, RUN_FIELDS[:-1])
+    data: Dict[str, Any] = {"output_dir": output_dir}
+    for field in selected:
+        if field in ARTIFACT_FIELDS:
+            artifact, reader = ARTIFACT_FIELDS[field]
+            data[field] = reader(output_dir, artifact)
+        elif field == "images":
+            data["images"] = {"hero_url": _hero_url(folder, output_dir)}
+        elif field == "coalesced":
+            data["coalesced"] = coalesced
+        elif field == "final_state":
+            data["final_state"] = final_state
+    return _json_response(request, data)
 
 
 @app.post("/image")
@@ -307,9 +514,9 @@ async def generate_image_for_folder(folder: str) -> JSONResponse:
     safe = _safe_join_output(folder)
     if not safe:
         return JSONResponse(status_code=400, content={"error": "invalid folder"})
-    blog_path = os.path.join(safe, "blog.md")
-    blog_md = _read_file(blog_path) or ""
+    blog_md = read_text(safe, "blog.md") or ""
     img = generate_image(blog_md, safe)
+    _details_cache.invalidate(folder)
     data = {
         "images": {
             "status": img.get("status"),
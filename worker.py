@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import signal
+import threading
+from dotenv import load_dotenv  # type: ignore
+
+from agents.content_writer import BLOG_MODES
+from agents.variant_agent import MAX_VARIANTS
+from orchestration.work_queue import open_queue
+from orchestration.worker import Worker, default_worker_id
+from utils.artifact_store import STORAGE_MODES
+from utils.deadline import positive_budget
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Distributed content workers backed by a shared queue")
+    parser.add_argument("--output-root", default=os.getenv("OUTPUT_ROOT", "outputs"), help="Shared root output directory")
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help="Queue URL: file:///shared/dir or sqlite:///path/queue.db (default: QUEUE_URL or file queue in <output-root>/.queue)",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enq = sub.add_parser("enqueue", help="Add topics to the queue")
+    enq.add_argument("topics", nargs="*", help="Topics to enqueue")
+    enq.add_argument("--file", default=None, help="Text file with one topic per line")
+    enq.add_argument("--no-image", action="store_true", help="Skip image generation")
+    enq.add_argument("--blog-mode", choices=BLOG_MODES, default=None, help="'single' or 'sectional' blog generation")
+    enq.add_argument("--variants", type=int, choices=range(1, MAX_VARIANTS + 1), metavar="N", default=None,
+                     help=f"Blog/social variants per topic (1-{MAX_VARIANTS})")
+    enq.add_argument("--storage", choices=STORAGE_MODES, default=None, help="'files' or 'compact' run storage")
+    enq.add_argument("--budget", type=positive_budget, default=None, help="Time budget per run in seconds")
+    enq.add_argument("--max-attempts", type=int, default=None, help="Runs before a job is marked failed (default: QUEUE_MAX_ATTEMPTS or 3)")
+
+    work = sub.add_parser("work", help="Lease and run topics until stopped")
+    work.add_argument("--concurrency", type=int, default=1, help="Jobs run in parallel by this process")
+    work.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs per worker thread")
+    work.add_argument("--exit-when-idle", action="store_true", help="Exit once the queue has no ready jobs")
+    work.add_argument("--lease", type=float, default=None, help="Lease length in seconds (default: QUEUE_LEASE_SECONDS or 120)")
+    work.add_argument("--id", default=None, help="Worker id prefix (default: hostname-pid)")
+
+    sub.add_parser("stats", help="Print queue depth and active leases as JSON")
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue, output_root=args.output_root)
+
+    if args.command == "enqueue":
+        topics = list(args.topics)
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as f:
+                topics += [line.strip() for line in f if line.strip()]
+        if not topics:
+            parser.error("no topics given")
+        options = {
+            "include_image": False if args.no_image else None,
+            "blog_mode": args.blog_mode,
+            "variants": args.variants,
+            "storage": args.storage,
+            "budget_seconds": args.budget,
+        }
+        options = {k: v for k, v in options.items() if v is not None}
+        for topic in topics:
+            print(f"{queue.enqueue(topic, options, max_attempts=args.max_attempts)} {topic}")
+
+    elif args.command == "work":
+        prefix = args.id or default_worker_id()
+        workers = [
+            Worker(queue, worker_id=f"{prefix}/{i}", output_root=args.output_root, lease_seconds=args.lease)
+            for i in range(max(1, args.concurrency))
+        ]
+
+        def shutdown(*_: object) -> None:
+            # Finish in-flight runs, lease nothing new
+            print("Stopping after current jobs...")
+            for w in workers:
+                w.stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        threads = [
+            threading.Thread(target=w.run, kwargs={"max_jobs": args.max_jobs, "exit_when_idle": args.exit_when_idle})
+            for w in workers
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    elif args.command == "stats":
+        print(json.dumps(queue.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()